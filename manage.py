@@ -1,11 +1,12 @@
 #!/usr/bin/env python
 """Django's command-line utility for administrative tasks."""
-import os
 import sys
 
+from yatube import boot
+
 
 def main():
-    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+    boot.prepare()
     try:
         from django.core.management import execute_from_command_line
     except ImportError as exc:
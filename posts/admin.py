@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Comment, Follow, Group, Post
+from .models import Comment, Follow, Group, Post, Recommendation
 
 
 @admin.register(Post)
@@ -32,3 +32,10 @@ class FollowAdmin(admin.ModelAdmin):
     search_fields = ('user', 'author')
     list_filter = ('user', 'author')
     empty_value_display = '-пусто-'
+
+
+@admin.register(Recommendation)
+class RecommendationAdmin(admin.ModelAdmin):
+    list_display = ('user', 'author', 'score')
+    raw_id_fields = ('user', 'author')
+    empty_value_display = '-пусто-'
@@ -0,0 +1,226 @@
+"""Ключи кеша и их сброс при изменении данных.
+
+Всё, что кешируется по набору объектов, привязано к версиям областей:
+``feed``, ``post:<id>``, ``author:<id>``, ``group:<id>``. Изменение
+объекта поднимает версии затронутых областей, поэтому ключи со старой
+версией больше не читаются и просто вытесняются по времени жизни.
+Версия — время последнего изменения области.
+
+Страницы лент, профилей и постов проверяются по версиям своих областей
+и областей выведенных постов: от них зависят ETag и ответ 304, а гости
+получают готовую страницу из кеша.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.db import transaction
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from yatube.cache import is_shared
+from yatube.routers import replica_snapshot
+
+POST_CARD_FRAGMENT = 'post_card'
+# Страницы и их метки живут недолго: версии сбрасывают их раньше.
+PAGE_TIMEOUT = 600
+
+
+def timeout(seconds):
+    """Время жизни записи: в кеше одного процесса не больше локального.
+
+    Сброс версии в другом воркере такому кешу не виден, поэтому без
+    ограничения он отдавал бы старые страницы и 304 бесконечно.
+    """
+    if is_shared(cache):
+        return seconds
+    local = settings.CACHE_LOCAL_TIMEOUT
+    return local if seconds is None else min(seconds, local)
+
+
+def post_card_key(post_id):
+    """Ключ фрагмента карточки поста из include/post_item.html."""
+    return make_template_fragment_key(POST_CARD_FRAGMENT, [post_id])
+
+
+def version_key(scope):
+    return f'version:{scope}'
+
+
+def get_versions(*scopes):
+    """Версии областей; неизвестная область считается изменённой сейчас."""
+    keys = [version_key(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    missing = {key: time.time() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, timeout(None))
+        found.update(missing)
+    return [found[key] for key in keys]
+
+
+def tag_page(request, *scopes):
+    """Отмечает области объектов, выведенных на странице.
+
+    Лента заранее не знает, какие посты покажет, поэтому их области
+    запоминаются после отрисовки и проверяются при следующем запросе.
+    """
+    request.page_tags = [*getattr(request, 'page_tags', ()), *scopes]
+
+
+def page_etag(request, versions):
+    """ETag страницы: версии областей, зритель и параметры запроса.
+
+    Страница авторизованного пользователя содержит его имя и CSRF-токен,
+    поэтому чужой или старый ответ совпасть не может.
+    """
+    parts = [*map(repr, versions), str(request.user.pk),
+             request.META.get('QUERY_STRING', '')]
+    if request.user.is_authenticated:
+        parts.append(request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''))
+    return quote_etag(hashlib.md5('|'.join(parts).encode()).hexdigest())
+
+
+def page_key(request):
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'page:{path}'
+
+
+def cached_page(request, key, versions):
+    """Ответ 304 или готовая страница гостя, если метки не менялись.
+
+    Возвращает (ответ или None, версии с метками или None).
+    """
+    tagged = cache.get(f'{key}:tags')
+    if tagged is None or tagged[0] != versions:
+        return None, None
+    versions = versions + get_versions(*tagged[1])
+    etag = page_etag(request, versions)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=int(max(versions)))
+    if response is None and not request.user.is_authenticated:
+        response = cache.get(f'{key}:{etag}')
+    return response, versions
+
+
+def store_page(request, key, versions, response):
+    """Запоминает метки страницы, а ответ гостю — целиком.
+
+    Страница, собранная из снимка реплики старше версий её областей,
+    не хранится и не получает ETag: возвращается None.
+    """
+    tags = getattr(request, 'page_tags', [])
+    tagged = versions + get_versions(*tags)
+    snapshot = replica_snapshot()
+    if snapshot is not None and max(tagged) > snapshot:
+        return None
+    cache.set(f'{key}:tags', (versions, tags), timeout(PAGE_TIMEOUT))
+    if not request.user.is_authenticated and not response.cookies:
+        cache.set(f'{key}:{page_etag(request, tagged)}', response,
+                  timeout(PAGE_TIMEOUT))
+    return tagged
+
+
+def with_validators(request, response, versions):
+    if versions is not None:
+        etag = page_etag(request, versions)
+        last_modified = int(max(versions))
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified,
+            response=response)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+    # Без проверки браузер мог бы сам решить, что копия свежая.
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def conditional_page(get_scopes):
+    """Отвечает 304 или страницей из кеша, если её области не менялись.
+
+    ``get_scopes(request, **kwargs)`` возвращает области страницы до
+    запросов к ленте и шаблонов или None, если объекта нет: тогда
+    view отвечает как обычно. Области выведенных объектов view отмечает
+    через ``tag_page``; изменение любой из них сбрасывает страницу.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            scopes = get_scopes(request, *args, **kwargs)
+            if scopes is None:
+                return view(request, *args, **kwargs)
+            key = page_key(request)
+            versions = get_versions(*scopes)
+            response, tagged = cached_page(request, key, versions)
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+                tagged = store_page(request, key, versions, response)
+            return with_validators(request, response, tagged)
+        return wrapper
+    return decorator
+
+
+def bump(*scopes):
+    """Поднимает версии областей сразу и ещё раз после фиксации транзакции.
+
+    Повторная запись не даёт параллельному запросу оставить в кеше данные,
+    прочитанные до фиксации.
+    """
+    def write():
+        now = time.time()
+        cache.set_many({version_key(scope): now for scope in scopes},
+                       timeout(None))
+
+    write()
+    transaction.on_commit(write)
+
+
+def invalidate_post_cards(post_ids):
+    """Сбрасывает карточки сразу и ещё раз после фиксации транзакции."""
+    keys = [post_card_key(post_id) for post_id in post_ids]
+    if keys:
+        cache.delete_many(keys)
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def post_scopes(post):
+    scopes = ['feed', f'post:{post.pk}', f'author:{post.author_id}']
+    # При правке пост мог уйти из прежней группы.
+    groups = {post.group_id, getattr(post, 'previous_group_id', None)}
+    scopes.extend(f'group:{group_id}' for group_id in groups if group_id)
+    return scopes
+
+
+def post_changed(post):
+    invalidate_post_cards([post.pk])
+    bump(*post_scopes(post))
+
+
+def comment_changed(comment):
+    invalidate_post_cards([comment.post_id])
+    bump(f'post:{comment.post_id}')
+
+
+def group_changed(group):
+    invalidate_post_cards(list(group.post_set.values_list('pk', flat=True)))
+    bump('feed', f'group:{group.pk}')
+
+
+def user_changed(user):
+    previous = getattr(user, 'previous_username', None)
+    if previous is not None and previous != user.username:
+        # Карточки постов выводят имя автора и ссылку на его профиль.
+        post_ids = list(user.post_set.values_list('pk', flat=True))
+        invalidate_post_cards(post_ids)
+        bump(*(f'post:{post_id}' for post_id in post_ids))
+    bump(f'author:{user.pk}')
+
+
+def follow_changed(follow):
+    bump(f'author:{follow.author_id}', f'author:{follow.user_id}')
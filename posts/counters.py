@@ -0,0 +1,96 @@
+"""Хранимые счётчики комментариев, постов и подписок."""
+import threading
+
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Post, UserStats
+
+User = get_user_model()
+
+
+def change_comments(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comment_count=F('comment_count') + delta)
+
+
+# Пользователи, которых сейчас удаляют в этом потоке.
+_deleting = threading.local()
+
+
+def deleting(user_id):
+    return user_id in getattr(_deleting, 'users', ())
+
+
+def start_deleting(user_id):
+    _deleting.users = {*getattr(_deleting, 'users', ()), user_id}
+
+
+def finish_deleting(user_id):
+    _deleting.users = getattr(_deleting, 'users', set()) - {user_id}
+
+
+def reset_deleting():
+    """Забывает удаления, прерванные ошибкой: post_delete их не снял."""
+    _deleting.users = set()
+
+
+def change_user(user_id, **deltas):
+    """Сдвигает счётчики пользователя.
+
+    Если строки нет, рост счётчика пересчитывает её заново, а уменьшение
+    только обновляет: при каскадном удалении пользователя его посты и
+    подписки удаляются вместе со строкой счётчиков, и создавать её снова
+    нельзя. Счётчики удаляемых пользователей не трогаются.
+    """
+    if deleting(user_id):
+        return
+    changes = {name: F(name) + delta for name, delta in deltas.items()}
+    updated = UserStats.objects.filter(user_id=user_id).update(**changes)
+    if not updated and all(delta > 0 for delta in deltas.values()):
+        recount_users(User.objects.filter(pk=user_id))
+
+
+def _count(model, field):
+    """Подзапрос с числом строк ``model``, где ``field`` равен pk."""
+    rows = (model.objects.filter(**{field: OuterRef('pk')})
+            .order_by().values(field).annotate(total=Count('pk'))
+            .values('total'))
+    return Coalesce(Subquery(rows), Value(0))
+
+
+def recount_posts(posts=None):
+    """Пересчитывает комментарии постов, возвращает число исправленных."""
+    posts = Post.objects.all() if posts is None else posts
+    drifted = (posts.order_by()
+               .annotate(actual=_count(Comment, 'post'))
+               .exclude(comment_count=F('actual'))
+               .values_list('pk', 'actual'))
+    fixed = 0
+    for pk, actual in drifted.iterator():
+        fixed += Post.objects.filter(pk=pk).update(comment_count=actual)
+    return fixed
+
+
+def recount_users(users=None):
+    """Пересчитывает счётчики пользователей, возвращает число исправленных."""
+    users = User.objects.all() if users is None else users
+    names = ('posts_count', 'followers_count', 'following_count')
+    rows = users.order_by().annotate(
+        posts_count_actual=_count(Post, 'author'),
+        followers_count_actual=_count(Follow, 'author'),
+        following_count_actual=_count(Follow, 'user'),
+    ).values('pk', 'stats__pk', *(f'stats__{name}' for name in names),
+             *(f'{name}_actual' for name in names))
+    fixed = 0
+    for row in rows.iterator():
+        actual = {name: row[f'{name}_actual'] for name in names}
+        if row['stats__pk'] is None:
+            UserStats.objects.create(user_id=row['pk'], **actual)
+        elif any(row[f'stats__{name}'] != actual[name] for name in names):
+            UserStats.objects.filter(pk=row['stats__pk']).update(**actual)
+        else:
+            continue
+        fixed += 1
+    return fixed
@@ -1,6 +1,7 @@
 from django.forms import ModelForm, Textarea
 
 from .models import Comment, Post
+from .uploadhandlers import RejectedUpload
 
 
 class PostForm(ModelForm):
@@ -8,6 +9,24 @@ class PostForm(ModelForm):
         model = Post
         fields = ('text', 'group', 'image')
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Файлы, отклонённые при загрузке, в форму не попадают,
+        # вместо них показывается причина.
+        self.upload_errors = {}
+        for name, upload in list(self.files.items()):
+            if isinstance(upload, RejectedUpload):
+                if not self.upload_errors:
+                    self.files = self.files.copy()
+                self.upload_errors[name] = upload.error
+                del self.files[name]
+
+    def clean(self):
+        cleaned_data = super().clean()
+        for name, error in self.upload_errors.items():
+            self.add_error(name, error)
+        return cleaned_data
+
 
 class CommentForm(ModelForm):
     class Meta:
@@ -0,0 +1,209 @@
+"""Фоновая подготовка картинок постов.
+
+Варианты картинки разной ширины в WebP и в исходном формате строит
+пул потоков самого приложения после сохранения поста или, если
+IMAGE_WORKERS равен нулю, отдельный воркер (``manage.py process_images``).
+Страница лишь читает готовые ширины из ``Post.image_widths``, пока их
+нет, в карточке показывается заглушка.
+"""
+import logging
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+
+from yatube.sqlite import retry
+
+from . import caching
+
+logger = logging.getLogger(__name__)
+
+# Ширины вариантов картинки и пропорции карточки поста (960x339).
+WIDTHS = (320, 640, 960, 1920)
+ASPECT = 339 / 960
+FALLBACK_WIDTH = 960
+# Ширина карточки в вёрстке: контейнер Bootstrap или весь экран.
+SIZES = '(min-width: 1200px) 1110px, 100vw'
+FORMATS = {'jpg': 'JPEG', 'png': 'PNG', 'gif': 'GIF', 'webp': 'WEBP'}
+EXTENSIONS = {'jpeg': 'jpg', 'jpg': 'jpg', 'png': 'png', 'gif': 'gif',
+              'webp': 'webp'}
+QUALITY = 80
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_WORKERS,
+            thread_name_prefix='thumbnails')
+    return _executor
+
+
+def pending():
+    """Посты с картинкой, для которой ещё нет вариантов."""
+    from .models import Post
+
+    return (Post.objects.exclude(image='').exclude(image=None)
+            .filter(image_widths=''))
+
+
+def schedule(post):
+    """Отдаёт картинку пулу потоков после фиксации транзакции.
+
+    Без пула запись остаётся в pending() до прохода воркера.
+    """
+    if not post.image or not settings.IMAGE_WORKERS:
+        return
+    post_id, name = post.pk, post.image.name
+    transaction.on_commit(
+        lambda: get_executor().submit(generate_in_worker, post_id, name))
+
+
+def delete_variants(name):
+    """Удаляет варианты прежней картинки после фиксации транзакции."""
+    if not name:
+        return
+    names = [variant_name(name, width, extension)
+             for width in WIDTHS for extension in extensions(name)]
+
+    def delete():
+        try:
+            for variant in names:
+                default_storage.delete(variant)
+        except Exception:
+            # Старые файлы не должны ломать уже сохранённую правку.
+            logger.exception('Не удалось удалить варианты %s', name)
+
+    transaction.on_commit(delete)
+
+
+def discard_on_rollback(post):
+    """Удаляет загруженную картинку, если попытка view не удастся.
+
+    Файл пишется в хранилище при сохранении поста, и откат транзакции
+    его не убирает: без этого каждый повтор оставлял бы копию.
+    """
+    def discard():
+        # До сохранения поста файл ещё не записан, удалять нечего.
+        if post.image and post.image._committed:
+            post.image.delete(save=False)
+
+    retry.on_rollback(discard)
+
+
+def original_extension(name):
+    """Расширение вариантов в исходном формате; неизвестное — jpg."""
+    extension = posixpath.splitext(name)[1].lstrip('.').lower()
+    return EXTENSIONS.get(extension, 'jpg')
+
+
+def extensions(name):
+    """Форматы вариантов: WebP и исходный, без повторов."""
+    return sorted({'webp', original_extension(name)})
+
+
+def variant_name(name, width, extension):
+    """Файл варианта лежит рядом с картинкой: posts/variants/<имя>/."""
+    directory = posixpath.join(posixpath.dirname(name), 'variants',
+                               posixpath.basename(name))
+    return posixpath.join(directory, f'{width}.{extension}')
+
+
+def widths_for(source_width):
+    """Ширины не больше исходной, но хотя бы самая маленькая."""
+    return [width for width in WIDTHS if width <= source_width] or WIDTHS[:1]
+
+
+def _save(image, name, extension):
+    image_format = FORMATS[extension]
+    if image_format == 'JPEG' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    buffer = BytesIO()
+    image.save(buffer, image_format, quality=QUALITY, optimize=True)
+    # Storage не перезаписывает файлы, а подбирает новое имя.
+    default_storage.delete(name)
+    default_storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def build_variants(name):
+    """Сохраняет все варианты картинки, возвращает их ширины."""
+    from PIL import Image, ImageOps
+
+    with default_storage.open(name) as source:
+        image = Image.open(source)
+        widths = widths_for(image.width)
+        size = (widths[-1], round(widths[-1] * ASPECT))
+        # JPEG можно декодировать сразу в уменьшенном виде.
+        image.draft('RGB', size)
+        image = image.convert('RGBA' if 'A' in image.getbands()
+                              or 'transparency' in image.info else 'RGB')
+        image = ImageOps.fit(image, size, Image.LANCZOS)
+    for width in reversed(widths):
+        image = image.resize((width, round(width * ASPECT)), Image.LANCZOS)
+        for extension in extensions(name):
+            _save(image, variant_name(name, width, extension), extension)
+    return widths
+
+
+def generate(post_id, name):
+    """Строит варианты и записывает их ширины, если картинка не сменилась."""
+    from .models import Post
+
+    try:
+        widths = build_variants(name)
+        posts = Post.objects.filter(pk=post_id, image=name)
+        if posts.update(image_widths=','.join(map(str, widths))):
+            caching.post_changed(posts.get())
+    except Exception:
+        logger.exception('Не удалось подготовить картинку %s', name)
+        return False
+    return True
+
+
+class Picture:
+    """Готовые варианты картинки поста для тегов picture и img."""
+    sizes = SIZES
+
+    def __init__(self, name, widths):
+        self.name = name
+        self.widths = widths
+        self.extension = original_extension(name)
+        self.width = max((width for width in widths
+                          if width <= FALLBACK_WIDTH), default=widths[0])
+        self.height = round(self.width * ASPECT)
+
+    def url(self, width, extension):
+        return default_storage.url(variant_name(self.name, width,
+                                                extension))
+
+    def srcset_for(self, extension):
+        return ', '.join(f'{self.url(width, extension)} {width}w'
+                         for width in self.widths)
+
+    @property
+    def src(self):
+        return self.url(self.width, self.extension)
+
+    @property
+    def srcset(self):
+        return self.srcset_for(self.extension)
+
+    @property
+    def webp_srcset(self):
+        if self.extension == 'webp':
+            return ''
+        return self.srcset_for('webp')
+
+
+def generate_in_worker(post_id, name):
+    try:
+        generate(post_id, name)
+    finally:
+        # У каждого потока своё соединение с базой, не держим его открытым.
+        connections.close_all()
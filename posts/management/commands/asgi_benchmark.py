@@ -0,0 +1,116 @@
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from itertools import cycle, islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.db.models import Count
+from django.urls import reverse
+
+from posts.management.commands.benchmark import percentile
+from posts.models import Group, Post
+from yatube.asgi import WsgiToAsgi, build_environ, call_wsgi
+
+
+def make_scope(url):
+    path, _, query = url.partition('?')
+    return {'type': 'http', 'method': 'GET', 'path': path,
+            'query_string': query.encode(), 'headers': [],
+            'http_version': '1.1', 'scheme': 'http'}
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает пул потоков WSGI и yatube.asgi при медленных '
+            'клиентах. Оба режима получают одинаковое число потоков Django, '
+            'все запросы приходят сразу, клиент читает каждый ответ '
+            '--client-delay секунд.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=400)
+        parser.add_argument('--threads', type=int, default=8,
+                            help='Потоков Django в обоих режимах.')
+        parser.add_argument('--connections', type=int, default=100,
+                            help='Одновременных соединений для ASGI.')
+        parser.add_argument('--client-delay', type=float, default=0.05)
+
+    def handle(self, *args, **options):
+        urls = list(islice(cycle(self.urls()), options['requests']))
+        application = get_wsgi_application()
+        for name, run in (('wsgi', self.run_wsgi), ('asgi', self.run_asgi)):
+            self.in_flight = self.peak = self.errors = 0
+            started = time.perf_counter()
+            latencies = run(application, urls, options)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f'{name}: {len(latencies) / elapsed:7.0f} запросов/с, '
+                f'p50 {statistics.median(latencies) * 1000:7.1f} мс, '
+                f'p99 {percentile(latencies, 99) * 1000:7.1f} мс, '
+                f'одновременно {self.peak}, ошибок {self.errors}')
+
+    def urls(self):
+        post = Post.objects.order_by('-comment_count', '-pk').first()
+        if post is None:
+            raise CommandError('База пуста, запустите generate_dataset.')
+        urls = [reverse('index'),
+                reverse('profile', args=[post.author.username]),
+                reverse('post', args=[post.author.username, post.pk])]
+        group = (Group.objects.annotate(posts=Count('post'))
+                 .order_by('-posts').first())
+        if group is not None:
+            urls.append(reverse('group', args=[group.slug]))
+        return urls
+
+    def track(self, change, status=200):
+        self.in_flight += change
+        self.peak = max(self.peak, self.in_flight)
+        self.errors += status != 200
+
+    def run_wsgi(self, application, urls, options):
+        """Поток отвечает клиенту сам и занят, пока тот читает ответ."""
+        started = time.perf_counter()
+
+        def request(url):
+            self.track(1)
+            status, _, _ = call_wsgi(
+                application, build_environ(make_scope(url), BytesIO()))
+            time.sleep(options['client_delay'])
+            self.track(-1, status)
+            return time.perf_counter() - started
+
+        with ThreadPoolExecutor(options['threads']) as pool:
+            return list(pool.map(request, urls))
+
+    def run_asgi(self, application, urls, options):
+        """Потоки только считают ответы, отправка ждёт в цикле событий."""
+        adapter = WsgiToAsgi(application, options['threads'])
+        started = time.perf_counter()
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def request(url, connections):
+            async with connections:
+                self.track(1)
+                response = {}
+
+                async def send(message):
+                    response.setdefault('status', message.get('status'))
+                    if not message.get('more_body', True):
+                        await asyncio.sleep(options['client_delay'])
+
+                await adapter(make_scope(url), receive, send)
+                self.track(-1, response['status'])
+                return time.perf_counter() - started
+
+        async def main():
+            connections = asyncio.Semaphore(options['connections'])
+            return await asyncio.gather(
+                *(request(url, connections) for url in urls))
+
+        try:
+            return asyncio.run(main())
+        finally:
+            adapter.executor.shutdown()
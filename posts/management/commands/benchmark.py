@@ -0,0 +1,119 @@
+import json
+import math
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Count
+from django.test import Client
+from django.urls import reverse
+
+from posts import search, urls
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+# Маршруты, которые по GET меняют данные: в замер не входят.
+WRITE_ROUTES = {'profile_follow', 'profile_unfollow', 'post_delete',
+                'add_comment'}
+# Маршруты, которые открывает автор поста, остальные — читатель.
+AUTHOR_ROUTES = {'post_edit'}
+
+
+def percentile(values, percent):
+    """Процентиль методом ближайшего ранга."""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(percent / 100 * len(ordered)) - 1, 0)]
+
+
+class QueryCounter:
+    def __init__(self):
+        self.queries = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = ('Замеряет время ответа и число запросов для всех маршрутов '
+            'posts.urls, печатает отчёт в JSON.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50,
+                            help='Запросов на маршрут.')
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--cold', action='store_true',
+                            help='Очищать кеш перед каждым запросом.')
+        parser.add_argument('--output', help='Файл для отчёта.')
+
+    def handle(self, *args, **options):
+        post = (Post.objects.order_by('-comment_count', '-pk')
+                .select_related('author').first())
+        reader = User.objects.order_by('-stats__following_count').first()
+        if post is None or reader is None:
+            raise CommandError('База пуста, запустите generate_dataset.')
+        group = (Group.objects.annotate(posts=Count('post'))
+                 .order_by('-posts').first())
+        values = {'username': post.author.username, 'post_id': post.pk,
+                  'slug': group.slug if group else ''}
+        clients = {'reader': Client(), 'author': Client()}
+        clients['reader'].force_login(reader)
+        clients['author'].force_login(post.author)
+        report = {
+            'dataset': {model.__name__: model.objects.count()
+                        for model in (User, Group, Post, Comment, Follow)},
+            'cache': settings.CACHES['default']['OPTIONS'].get('BACKEND'),
+            'cold': options['cold'],
+            'routes': {},
+            'skipped': sorted(WRITE_ROUTES),
+        }
+        for pattern in urls.urlpatterns:
+            if pattern.name in WRITE_ROUTES:
+                continue
+            kwargs = {key: values[key] for key in pattern.pattern.converters}
+            url = reverse(pattern.name, kwargs=kwargs)
+            if pattern.name == 'search':
+                url += f'?q={self.search_word(post)}'
+            client = clients['author' if pattern.name in AUTHOR_ROUTES
+                             else 'reader']
+            report['routes'][pattern.name] = self.measure(client, url,
+                                                          options)
+        report = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                output.write(report + '\n')
+        else:
+            self.stdout.write(report)
+
+    def search_word(self, post):
+        words = search.WORD.findall(post.text)
+        return words[0] if words else ''
+
+    def measure(self, client, url, options):
+        for _ in range(options['warmup']):
+            client.get(url)
+        timings, queries = [], []
+        for _ in range(options['requests']):
+            if options['cold']:
+                cache.clear()
+            counter = QueryCounter()
+            started = time.perf_counter()
+            with connections['default'].execute_wrapper(counter):
+                response = client.get(url)
+            timings.append((time.perf_counter() - started) * 1000)
+            queries.append(counter.queries)
+        return {
+            'url': url,
+            'status': response.status_code,
+            'p50_ms': round(percentile(timings, 50), 2),
+            'p95_ms': round(percentile(timings, 95), 2),
+            'p99_ms': round(percentile(timings, 99), 2),
+            'mean_ms': round(statistics.mean(timings), 2),
+            'queries_mean': round(statistics.mean(queries), 2),
+            'queries_max': max(queries),
+        }
@@ -0,0 +1,128 @@
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from yatube import boot
+
+# Запуск воркера по шагам: настройки, приложения, маршруты, шаблоны.
+# Время импорта каждого модуля печатает сам Python (-X importtime).
+SCRIPT = '''
+import json, sys, time
+from yatube import boot
+if sys.argv[1] == '1':
+    boot.prepare()
+phases, apps = {}, {}
+started = time.perf_counter()
+
+def phase(name):
+    global started
+    now = time.perf_counter()
+    phases[name] = (now - started) * 1000
+    started = now
+
+import django
+from django.conf import settings
+settings.INSTALLED_APPS
+phase('settings')
+from django.apps import AppConfig
+import_models = AppConfig.import_models
+
+def timed_import_models(self):
+    begin = time.perf_counter()
+    import_models(self)
+    timing = apps[self.label] = {'models': (time.perf_counter() - begin)
+                                 * 1000}
+    ready = self.ready
+
+    def timed_ready():
+        begin = time.perf_counter()
+        ready()
+        timing['ready'] = (time.perf_counter() - begin) * 1000
+    self.ready = timed_ready
+
+AppConfig.import_models = timed_import_models
+django.setup()
+phase('apps')
+from django.urls import get_resolver
+get_resolver().reverse_dict
+phase('urls')
+boot.warm_up()
+phase('templates')
+print(json.dumps({'phases': phases, 'apps': apps}))
+'''
+IMPORT_TIME = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def parse_import_times(lines):
+    """Собственное и полное время импорта модулей в мс."""
+    modules = {}
+    for line in lines:
+        match = IMPORT_TIME.match(line)
+        if match:
+            own, total, _, name = match.groups()
+            modules[name] = (int(own) / 1000, int(total) / 1000)
+    return modules
+
+
+class Command(BaseCommand):
+    help = ('Запускает воркер в отдельном процессе и печатает время '
+            'загрузки настроек, приложений, маршрутов и шаблонов, а также '
+            'самые долгие импорты.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=15,
+                            help='Сколько модулей и пакетов показать.')
+        parser.add_argument('--without-prepare', action='store_true',
+                            help='Не задавать окружение yatube.boot, '
+                                 'для сравнения.')
+        parser.add_argument('--json', action='store_true')
+
+    def handle(self, *args, **options):
+        env = dict(os.environ)
+        if options['without_prepare']:
+            for name in boot.ENVIRONMENT:
+                env.pop(name, None)
+        env.setdefault('DJANGO_SETTINGS_MODULE',
+                       os.environ['DJANGO_SETTINGS_MODULE'])
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', SCRIPT,
+             '0' if options['without_prepare'] else '1'],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True)
+        if result.returncode:
+            raise CommandError(result.stderr.strip().splitlines()[-1])
+        report = json.loads(result.stdout.strip().splitlines()[-1])
+        modules = parse_import_times(result.stderr.splitlines())
+        packages = Counter()
+        for name, (own, _) in modules.items():
+            packages[name.split('.')[0]] += own
+        report['packages'] = dict(packages.most_common(options['limit']))
+        report['modules'] = dict(sorted(
+            modules.items(), key=lambda item: -item[1][0]
+        )[:options['limit']])
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self.print_report(report)
+
+    def print_report(self, report):
+        total = sum(report['phases'].values())
+        self.stdout.write(f'Запуск: {total:.1f} мс')
+        for name, milliseconds in report['phases'].items():
+            self.stdout.write(f'  {name:<30} {milliseconds:8.1f} мс')
+        self.stdout.write('Приложения (модели / ready):')
+        for label, timing in report['apps'].items():
+            self.stdout.write(f'  {label:<30} {timing["models"]:8.1f} мс '
+                              f'{timing.get("ready", 0):8.1f} мс')
+        self.stdout.write('Пакеты (собственное время импорта):')
+        for name, milliseconds in report['packages'].items():
+            self.stdout.write(f'  {name:<30} {milliseconds:8.1f} мс')
+        self.stdout.write('Модули (собственное / с вложенными):')
+        for name, (own, cumulative) in report['modules'].items():
+            self.stdout.write(f'  {name:<30} {own:8.1f} мс '
+                              f'{cumulative:8.1f} мс')
@@ -0,0 +1,82 @@
+import itertools
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+
+def zipf_weights(size, exponent=1.1):
+    """Накопленные веса: немногие ключи запрашиваются чаще остальных."""
+    return list(itertools.accumulate(1 / rank ** exponent
+                                     for rank in range(1, size + 1)))
+
+
+def make_cache(name, directory):
+    """Кеш выбранного бэкенда; default — как настроено в settings."""
+    if name == 'default':
+        return caches['default']
+    location = os.path.join(directory, name)
+    backend = import_string(settings.CACHE_BACKENDS[name])
+    return backend(location, {'OPTIONS': {'MAX_ENTRIES': 100000}})
+
+
+def worker(name, directory, options, seed):
+    """Имитирует запросы одного воркера: читаем, при промахе пишем."""
+    cache = make_cache(name, directory)
+    rnd = random.Random(seed)
+    keys = [f'bench:{number}' for number in range(options['keys'])]
+    weights = zipf_weights(len(keys))
+    payload = 'x' * options['size']
+    hits = misses = 0
+    for _ in range(options['requests']):
+        key = rnd.choices(keys, cum_weights=weights)[0]
+        if cache.get(key) is None:
+            misses += 1
+            cache.set(key, payload, options['timeout'])
+        else:
+            hits += 1
+        if rnd.random() < options['invalidate']:
+            cache.delete(rnd.choice(keys))
+    return hits, misses
+
+
+class Command(BaseCommand):
+    help = ('Доля попаданий в кеш у N процессов-воркеров для разных '
+            'бэкендов: у locmem кеш свой в каждом процессе, '
+            'у sqlite и file — общий.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backends', nargs='+',
+                            default=['locmem', 'sqlite', 'file'],
+                            choices=['default', *settings.CACHE_BACKENDS])
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--keys', type=int, default=500)
+        parser.add_argument('--size', type=int, default=2048,
+                            help='Размер значения в байтах.')
+        parser.add_argument('--timeout', type=int, default=300)
+        parser.add_argument('--invalidate', type=float, default=0.01,
+                            help='Доля запросов, сбрасывающих ключ.')
+
+    def handle(self, *args, **options):
+        context = multiprocessing.get_context('fork')
+        with tempfile.TemporaryDirectory() as directory:
+            for name in options['backends']:
+                started = time.perf_counter()
+                with context.Pool(options['workers']) as pool:
+                    results = pool.starmap(worker, [
+                        (name, directory, options, seed)
+                        for seed in range(options['workers'])])
+                elapsed = time.perf_counter() - started
+                hits = sum(hit for hit, _ in results)
+                total = hits + sum(miss for _, miss in results)
+                self.stdout.write(
+                    f'{name:>8}: воркеров {options["workers"]}, '
+                    f'попаданий {hits / total:.1%}, '
+                    f'{total / elapsed:,.0f} запросов/с')
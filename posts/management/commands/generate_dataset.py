@@ -0,0 +1,192 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from posts import images
+from posts.models import Comment, Follow, Group, Post, UserStats
+
+from .cache_benchmark import zipf_weights
+
+User = get_user_model()
+
+WORDS = ('день', 'город', 'фото', 'кот', 'море', 'книга', 'музыка', 'кофе',
+         'дорога', 'лес', 'работа', 'код', 'дом', 'утро', 'вечер', 'друг',
+         'поезд', 'снег', 'лето', 'горы', 'река', 'небо', 'сад', 'чай')
+
+
+@contextmanager
+def explicit_dates(*fields):
+    """Позволяет задать даты полям с auto_now_add при bulk_create."""
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = ('Заполняет базу большим набором данных с перекосом: немногие '
+            'авторы пишут и собирают подписчиков и комментарии больше '
+            'остальных.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--comments', type=int, default=500000)
+        parser.add_argument('--follows', type=int, default=100000)
+        parser.add_argument('--images', type=float, default=0.1,
+                            help='Доля постов с картинкой.')
+        parser.add_argument('--image-pool', type=int, default=10,
+                            help='Сколько разных картинок сгенерировать.')
+        parser.add_argument('--days', type=int, default=365,
+                            help='За сколько дней раскидать даты.')
+        parser.add_argument('--exponent', type=float, default=1.1,
+                            help='Показатель распределения Ципфа.')
+        parser.add_argument('--batch', type=int, default=5000)
+        parser.add_argument('--prefix', default='bench')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.rnd = random.Random(options['seed'])
+        self.now = timezone.now()
+        users = self.step('пользователи', self.create_users)
+        groups = self.step('группы', self.create_groups)
+        pool = self.step('картинки', self.create_images)
+        posts = self.step('посты', self.create_posts, users, groups, pool)
+        self.step('подписки', self.create_follows, users)
+        self.step('комментарии', self.create_comments, users, posts)
+        # bulk_create не шлёт сигналы: счётчики, ленты и поиск
+        # собираются заново.
+        for command in ('recount', 'rebuild_timeline',
+                        'rebuild_search_index'):
+            self.step(command, call_command, command, stdout=self.stdout)
+
+    def step(self, title, function, *args, **kwargs):
+        started = time.perf_counter()
+        result = function(*args, **kwargs)
+        self.stdout.write(f'{title}: {time.perf_counter() - started:.1f} с')
+        return result
+
+    def batches(self, total):
+        for start in range(0, total, self.options['batch']):
+            yield min(self.options['batch'], total - start)
+
+    def weights(self, size):
+        return zipf_weights(size, self.options['exponent'])
+
+    def random_date(self):
+        return self.now - timedelta(
+            seconds=self.rnd.uniform(0, self.options['days'] * 86400))
+
+    def random_text(self, words):
+        return ' '.join(self.rnd.choices(WORDS, cum_weights=words,
+                                         k=self.rnd.randint(5, 60)))
+
+    def bulk(self, model, objects):
+        with transaction.atomic():
+            model.objects.bulk_create(objects, ignore_conflicts=True)
+
+    def create_users(self):
+        prefix = self.options['prefix']
+        for size in self.batches(self.options['users']):
+            start = User.objects.filter(username__startswith=prefix).count()
+            self.bulk(User, [
+                User(username=f'{prefix}{start + number}', password='!')
+                for number in range(size)])
+        users = list(User.objects.filter(username__startswith=prefix)
+                     .values_list('pk', flat=True))
+        self.bulk(UserStats, [UserStats(user_id=pk) for pk in users])
+        return users
+
+    def create_groups(self):
+        prefix = self.options['prefix']
+        self.bulk(Group, [
+            Group(title=f'Группа {number}', slug=f'{prefix}-{number}',
+                  description=f'Сообщество номер {number}')
+            for number in range(self.options['groups'])])
+        return list(Group.objects.filter(slug__startswith=f'{prefix}-')
+                    .values_list('pk', flat=True))
+
+    def create_images(self):
+        """Картинки-заготовки с готовыми вариантами для постов."""
+        from PIL import Image
+
+        pool = []
+        for number in range(self.options['image_pool']):
+            image = Image.effect_mandelbrot(
+                (1600, 1200), (-2 + number * 0.05, -1.2, 1, 1.2), 60)
+            buffer = BytesIO()
+            image.convert('RGB').save(buffer, 'JPEG', quality=85)
+            name = default_storage.save(
+                f'posts/{self.options["prefix"]}-{number}.jpg',
+                ContentFile(buffer.getvalue()))
+            widths = images.build_variants(name)
+            pool.append((name, ','.join(map(str, widths))))
+        return pool
+
+    def create_posts(self, users, groups, pool):
+        authors = self.weights(len(users))
+        topics = self.weights(len(groups)) if groups else None
+        words = self.weights(len(WORDS))
+        with explicit_dates(Post._meta.get_field('pub_date')):
+            for size in self.batches(self.options['posts']):
+                posts = []
+                for author in self.rnd.choices(users, cum_weights=authors,
+                                               k=size):
+                    post = Post(author_id=author, pub_date=self.random_date(),
+                                text=self.random_text(words))
+                    if groups and self.rnd.random() < 0.7:
+                        post.group_id = self.rnd.choices(
+                            groups, cum_weights=topics)[0]
+                    if pool and self.rnd.random() < self.options['images']:
+                        post.image, post.image_widths = self.rnd.choice(pool)
+                    posts.append(post)
+                self.bulk(Post, posts)
+        return list(Post.objects.filter(author__in=users)
+                    .values_list('pk', flat=True))
+
+    def create_follows(self, users):
+        """Подписчики выбираются равномерно, авторы — по Ципфу."""
+        authors = self.weights(len(users))
+        existing = set(Follow.objects.filter(user__in=users)
+                       .values_list('user_id', 'author_id'))
+        for size in self.batches(self.options['follows']):
+            follows = []
+            for author in self.rnd.choices(users, cum_weights=authors,
+                                           k=size):
+                user = self.rnd.choice(users)
+                if user != author and (user, author) not in existing:
+                    existing.add((user, author))
+                    follows.append(Follow(user_id=user, author_id=author))
+            self.bulk(Follow, follows)
+
+    def create_comments(self, users, posts):
+        if not posts:
+            return
+        authors = self.weights(len(users))
+        popular = self.weights(len(posts))
+        words = self.weights(len(WORDS))
+        with explicit_dates(Comment._meta.get_field('created')):
+            for size in self.batches(self.options['comments']):
+                self.bulk(Comment, [
+                    Comment(post_id=post, author_id=author,
+                            created=self.random_date(),
+                            text=self.random_text(words))
+                    for post, author in zip(
+                        self.rnd.choices(posts, cum_weights=popular, k=size),
+                        self.rnd.choices(users, cum_weights=authors,
+                                         k=size))])
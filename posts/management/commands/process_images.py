@@ -0,0 +1,46 @@
+import multiprocessing
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts import images
+
+
+def process(item):
+    post_id, name = item
+    return post_id, name, images.generate(post_id, name)
+
+
+class Command(BaseCommand):
+    help = 'Воркер: готовит варианты картинок новых постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=2)
+        parser.add_argument('--batch', type=int, default=50)
+        parser.add_argument('--interval', type=float, default=2,
+                            help='Пауза в секундах, когда очередь пуста.')
+        parser.add_argument('--once', action='store_true',
+                            help='Обработать очередь один раз и выйти.')
+
+    def handle(self, *args, **options):
+        failed = set()
+        # Дочерние процессы откроют свои соединения с базой.
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        with context.Pool(options['processes']) as pool:
+            while True:
+                batch = [item for item in
+                         images.pending().values_list('pk', 'image')
+                         [:options['batch'] + len(failed)]
+                         if item not in failed][:options['batch']]
+                for post_id, name, done in pool.imap_unordered(process,
+                                                               batch):
+                    if not done:
+                        failed.add((post_id, name))
+                    self.stdout.write(f'{post_id}: {name} '
+                                      f'{"готово" if done else "ошибка"}')
+                if options['once'] and len(batch) < options['batch']:
+                    break
+                if not batch:
+                    time.sleep(options['interval'])
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import recommendations
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает рекомендации «кого читать» по графу подписок.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int,
+                            help='Авторов на читателя.')
+        parser.add_argument('--sample', type=int,
+                            help='Подписок автора или читателя в расчёте.')
+        parser.add_argument('--batch', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if recommendations.load_numpy() is None:
+            self.stderr.write('NumPy не установлен: расчёт на списках Python '
+                              'будет намного медленнее.')
+        started = time.perf_counter()
+        with transaction.atomic():
+            rows = recommendations.rebuild(options['count'],
+                                           options['sample'],
+                                           options['batch'])
+        engine = ('numpy' if recommendations.load_numpy() is not None
+                  else 'python')
+        self.stdout.write(f'Рекомендаций: {rows} ({engine}, '
+                          f'{time.perf_counter() - started:.1f} с)')
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = 'Заполняет полнотекстовый индекс постов заново.'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            documents = search.rebuild()
+        self.stdout.write(f'Документов в индексе: {documents}')
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import timeline
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает готовые ленты подписок.'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            entries = timeline.rebuild()
+        self.stdout.write(f'Записей в лентах: {entries}')
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает хранимые счётчики и исправляет расхождения.'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            posts = counters.recount_posts()
+            users = counters.recount_users()
+        self.stdout.write(f'Исправлено постов: {posts}, '
+                          f'пользователей: {users}')
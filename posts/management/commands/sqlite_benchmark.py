@@ -0,0 +1,142 @@
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from posts.management.commands.benchmark import percentile
+from posts.models import Comment, Post
+from yatube.sqlite.base import PRAGMAS, configure
+
+PROFILES = {
+    # Как было: журнал отката, BEGIN DEFERRED, таймаут по умолчанию.
+    'default': {'pragmas': {'journal_mode': 'DELETE'}, 'begin': 'BEGIN'},
+    'tuned': {'pragmas': PRAGMAS, 'begin': 'BEGIN IMMEDIATE'},
+}
+
+
+def compile_query(queryset):
+    sql, params = queryset.query.sql_with_params()
+    return sql.replace('%s', '?'), list(params)
+
+
+def open_database(path, profile):
+    database = sqlite3.connect(path, timeout=5, isolation_level=None)
+    configure(database, PROFILES[profile]['pragmas'])
+    return database
+
+
+def reader(path, profile, queries, deadline):
+    """Читает ленты до конца замера, возвращает задержки чтений."""
+    database = open_database(path, profile)
+    rnd = random.Random(os.getpid())
+    latencies, errors = [], 0
+    while time.time() < deadline:
+        sql, params = rnd.choice(queries)
+        started = time.perf_counter()
+        try:
+            database.execute(sql, params).fetchall()
+        except sqlite3.OperationalError:
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - started)
+    return 'read', latencies, errors
+
+
+def writer(path, profile, post_ids, author_id, deadline):
+    """Пишет комментарии, как add_comment: чтение поста и две записи."""
+    database = open_database(path, profile)
+    rnd = random.Random(os.getpid())
+    comments = Comment._meta.db_table
+    posts = Post._meta.db_table
+    latencies, errors = [], 0
+    while time.time() < deadline:
+        post_id = rnd.choice(post_ids)
+        started = time.perf_counter()
+        try:
+            database.execute(PROFILES[profile]['begin'])
+            database.execute(f'SELECT id FROM {posts} WHERE id = ?',
+                             [post_id]).fetchone()
+            database.execute(
+                f'INSERT INTO {comments} (post_id, author_id, text, '
+                'created) VALUES (?, ?, ?, ?)',
+                [post_id, author_id, 'benchmark',
+                 timezone.now().isoformat(' ')])
+            database.execute(f'UPDATE {posts} SET comment_count = '
+                             'comment_count + 1 WHERE id = ?', [post_id])
+            database.execute('COMMIT')
+        except sqlite3.OperationalError:
+            errors += 1
+            if database.in_transaction:
+                database.execute('ROLLBACK')
+            continue
+        latencies.append(time.perf_counter() - started)
+    return 'write', latencies, errors
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает пропускную способность SQLite с настройками '
+            'по умолчанию и в режиме WAL при одновременных читателях '
+            'и писателях. Работает с копией базы.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--seconds', type=float, default=5)
+        parser.add_argument('--profiles', nargs='+', choices=PROFILES,
+                            default=list(PROFILES))
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Замер только для SQLite.')
+        post_ids = list(Post.objects.values_list('pk', flat=True)[:1000])
+        if not post_ids:
+            raise CommandError('База пуста, запустите generate_dataset.')
+        post = Post.objects.get(pk=post_ids[0])
+        queries = [
+            compile_query(Post.objects.for_feed()[:11]),
+            compile_query(Post.objects.for_feed()
+                          .filter(author_id=post.author_id)[:11]),
+            compile_query(post.comments.select_related('author')[:20]),
+        ]
+        context = multiprocessing.get_context('fork')
+        with tempfile.TemporaryDirectory() as directory:
+            for profile in options['profiles']:
+                path = os.path.join(directory, f'{profile}.sqlite3')
+                self.copy_database(path, profile)
+                deadline = time.time() + 0.5 + options['seconds']
+                with context.Pool(options['readers']
+                                  + options['writers']) as pool:
+                    jobs = [pool.apply_async(reader, (path, profile, queries,
+                                                      deadline))
+                            for _ in range(options['readers'])]
+                    jobs += [pool.apply_async(writer, (path, profile,
+                                                       post_ids,
+                                                       post.author_id,
+                                                       deadline))
+                             for _ in range(options['writers'])]
+                    results = [job.get() for job in jobs]
+                self.report(profile, results, options['seconds'])
+
+    def copy_database(self, path, profile):
+        connection.ensure_connection()
+        target = sqlite3.connect(path)
+        connection.connection.backup(target)
+        configure(target, PROFILES[profile]['pragmas'])
+        target.close()
+
+    def report(self, profile, results, seconds):
+        for kind in ('read', 'write'):
+            latencies = [value for result_kind, values, _ in results
+                         if result_kind == kind for value in values]
+            errors = sum(errors for result_kind, _, errors in results
+                         if result_kind == kind)
+            p99 = percentile(latencies, 99) * 1000 if latencies else 0
+            self.stdout.write(
+                f'{profile:>8} {kind:>5}: {len(latencies) / seconds:8.0f}/с, '
+                f'p99 {p99:6.1f} мс, ошибок {errors}')
@@ -0,0 +1,57 @@
+import os
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+
+class Command(BaseCommand):
+    help = ('Копирует основную базу SQLite в файлы реплик из '
+            'DATABASE_REPLICAS раз в REPLICA_SYNC_INTERVAL секунд. Копия '
+            'подменяет файл целиком, читатели видят её с новыми '
+            'соединениями.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float,
+                            default=settings.REPLICA_SYNC_INTERVAL,
+                            help='Повторять раз в N секунд. Дольше '
+                                 'REPLICA_SYNC_INTERVAL нельзя: '
+                                 'по нему считается отставание реплик.')
+        parser.add_argument('--once', action='store_true',
+                            help='Скопировать один раз и выйти.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Копирование реплик только для SQLite.')
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError('Реплики не заданы: YATUBE_DB_REPLICAS.')
+        while True:
+            for alias, path in settings.DATABASE_REPLICAS.items():
+                started = time.perf_counter()
+                self.copy(path)
+                self.stdout.write(f'{alias}: {path} за '
+                                  f'{time.perf_counter() - started:.2f} с')
+            if options['once']:
+                break
+            time.sleep(options['interval'])
+
+    def copy(self, path):
+        """Снимок базы через backup API, затем атомарная подмена файла.
+
+        Время изменения копии — начало снимка: по нему читатели решают,
+        можно ли кешировать собранный из реплики ответ.
+        """
+        connection.ensure_connection()
+        taken = time.time()
+        temporary = f'{path}.tmp'
+        target = sqlite3.connect(temporary)
+        try:
+            connection.connection.backup(target)
+            # Реплика открывается только на чтение, ей не нужен WAL.
+            target.execute('PRAGMA journal_mode = DELETE')
+        finally:
+            target.close()
+        os.utime(temporary, (taken, taken))
+        os.replace(temporary, path)
@@ -0,0 +1,17 @@
+# Generated by Django 2.2.28 on 2026-10-18 02:56
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_auto_20211016_1046'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='post',
+            options={'ordering': ('-pub_date', '-id'), 'verbose_name': 'AuthorPost'},
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 2.2.28 on 2026-10-18 02:59
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_counters(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Follow = apps.get_model('posts', 'Follow')
+    UserStats = apps.get_model('posts', 'UserStats')
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    totals = Post.objects.order_by().annotate(total=models.Count('comments'))
+    for post in totals:
+        if post.total:
+            Post.objects.filter(pk=post.pk).update(comment_count=post.total)
+    posts = dict(Post.objects.values_list('author')
+                 .annotate(models.Count('pk')).order_by())
+    followers = dict(Follow.objects.values_list('author')
+                     .annotate(models.Count('pk')).order_by())
+    following = dict(Follow.objects.values_list('user')
+                     .annotate(models.Count('pk')).order_by())
+    UserStats.objects.bulk_create(
+        (UserStats(user_id=pk,
+                   posts_count=posts.get(pk, 0),
+                   followers_count=followers.get(pk, 0),
+                   following_count=following.get(pk, 0))
+         for pk in User.objects.values_list('pk', flat=True)),
+        batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0017_timeline'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='comments'),
+        ),
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='posts')),
+                ('followers_count', models.PositiveIntegerField(default=0, verbose_name='followers')),
+                ('following_count', models.PositiveIntegerField(default=0, verbose_name='following')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'UserStats',
+            },
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+from django.db import migrations
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        'CREATE VIRTUAL TABLE IF NOT EXISTS posts_search USING fts5('
+        'text, kind UNINDEXED, object_id UNINDEXED, post_id UNINDEXED, '
+        "tokenize = 'unicode61 remove_diacritics 2')")
+    schema_editor.execute(
+        'INSERT INTO posts_search (rowid, text, kind, object_id, post_id) '
+        "SELECT id * 3, text, 'post', id, id FROM posts_post")
+    schema_editor.execute(
+        'INSERT INTO posts_search (rowid, text, kind, object_id, post_id) '
+        "SELECT id * 3 + 1, text, 'comment', id, post_id "
+        'FROM posts_comment')
+    schema_editor.execute(
+        'INSERT INTO posts_search (rowid, text, kind, object_id, post_id) '
+        "SELECT id * 3 + 2, title || char(10) || description, 'group', "
+        'id, NULL FROM posts_group')
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS posts_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-18 03:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0019_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_thumbnail',
+            field=models.CharField(blank=True, default='', max_length=255, verbose_name='thumbnail'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 2.2.28 on 2026-10-18 03:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0020_post_image_thumbnail'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='post',
+            name='image_thumbnail',
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='image_widths',
+            field=models.CharField(blank=True, default='', max_length=32, verbose_name='image widths'),
+        ),
+    ]
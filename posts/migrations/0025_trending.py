@@ -0,0 +1,42 @@
+# Generated by Django 2.2.28 on 2026-10-18 03:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0024_recommendation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingGroup',
+            fields=[
+                ('group', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trend', serialize=False, to='posts.Group')),
+                ('rank', models.FloatField(verbose_name='rank')),
+            ],
+            options={
+                'verbose_name': 'TrendingGroup',
+            },
+        ),
+        migrations.CreateModel(
+            name='TrendingPost',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trend', serialize=False, to='posts.Post')),
+                ('rank', models.FloatField(verbose_name='rank')),
+            ],
+            options={
+                'verbose_name': 'TrendingPost',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='trendingpost',
+            index=models.Index(fields=['rank', 'post'], name='trending_post_rank_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trendinggroup',
+            index=models.Index(fields=['rank', 'group'], name='trending_group_rank_idx'),
+        ),
+    ]
@@ -17,6 +17,13 @@ class Group(models.Model):
         return f'{self.title}'
 
 
+class PostQuerySet(models.QuerySet):
+    """Выборки постов для лент."""
+    def for_feed(self):
+        """Посты вместе с автором и группой одним запросом."""
+        return self.select_related('author', 'group')
+
+
 class Post(models.Model):
     """Посты авторов."""
     text = models.TextField(verbose_name='Текст',
@@ -24,29 +31,54 @@ class Post(models.Model):
     pub_date = models.DateTimeField('date published',
                                     auto_now_add=True,
                                     db_index=True)
-    author = models.ForeignKey(User, on_delete=models.CASCADE)
+    # Отдельные индексы не нужны: поля открывают составные индексы лент.
+    author = models.ForeignKey(User, on_delete=models.CASCADE,
+                               db_index=False)
     group = models.ForeignKey(Group, models.SET_NULL,
                               blank=True,
                               null=True,
+                              db_index=False,
                               verbose_name='Группа',
                               help_text='Выберите группу')
     image = models.ImageField(upload_to='posts/',
                               blank=True,
                               null=True,
                               help_text='Добавте картинку')
+    image_widths = models.CharField('image widths', max_length=32,
+                                    blank=True, default='')
+    comment_count = models.PositiveIntegerField('comments', default=0)
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'AuthorPost'
-        ordering = ('-pub_date',)
+        ordering = ('-pub_date', '-id')
+        # Ленты автора и группы читаются по индексу уже в нужном порядке.
+        indexes = [
+            models.Index(fields=('author', '-pub_date', '-id'),
+                         name='post_author_feed_idx'),
+            models.Index(fields=('group', '-pub_date', '-id'),
+                         name='post_group_feed_idx'),
+        ]
 
     def __str__(self):
         return f'{self.text[:15]}'
 
+    @property
+    def picture(self):
+        """Готовые варианты картинки или None, пока их нет."""
+        from .images import Picture
+
+        if not self.image or not self.image_widths:
+            return None
+        widths = [int(width) for width in self.image_widths.split(',')]
+        return Picture(self.image.name, widths)
+
 
 class Comment(models.Model):
     """Комменатрии к постам"""
     post = models.ForeignKey(Post, on_delete=models.CASCADE,
-                             related_name='comments')
+                             related_name='comments', db_index=False)
     author = models.ForeignKey(User, on_delete=models.CASCADE,
                                related_name='comments')
     text = models.TextField(verbose_name='Комментарий',
@@ -58,6 +90,11 @@ class Comment(models.Model):
     class Meta:
         verbose_name = 'CommentPost'
         ordering = ('-created',)
+        indexes = [
+            # -id: порции комментариев листаются по (created, id).
+            models.Index(fields=('post', '-created', '-id'),
+                         name='comment_post_feed_idx'),
+        ]
 
     def __str__(self):
         return f'{self.text[:10]}'
@@ -69,7 +106,117 @@ class Follow(models.Model):
                              related_name='follower')
     author = models.ForeignKey(User, on_delete=models.CASCADE,
                                related_name='following')
+    fanout = models.BooleanField('fan-out on write', default=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=('user', 'author'),
+                                    name='unique_follow'),
+            models.CheckConstraint(check=~models.Q(user=models.F('author')),
+                                   name='no_self_follow'),
+        ]
 
     def __str__(self):
         return f'Подписок {self.user.count()},'
         f'Подписавшихся {self.author.count()}'
+
+
+class TimelineEntry(models.Model):
+    """Пост в готовой ленте подписчика."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE,
+                             related_name='timeline')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE,
+                             related_name='timeline_entries')
+    # Копия даты поста: лента сортируется по индексу без чтения постов.
+    pub_date = models.DateTimeField('date published')
+
+    class Meta:
+        verbose_name = 'TimelineEntry'
+        constraints = [
+            models.UniqueConstraint(fields=('user', 'post'),
+                                    name='unique_timeline_entry'),
+        ]
+        indexes = [
+            models.Index(fields=('user', '-pub_date', '-post'),
+                         name='timeline_feed_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id}: {self.post_id}'
+
+
+class UserStats(models.Model):
+    """Счётчики пользователя, чтобы не считать их при каждом показе."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE,
+                                related_name='stats')
+    posts_count = models.PositiveIntegerField('posts', default=0)
+    followers_count = models.PositiveIntegerField('followers', default=0)
+    following_count = models.PositiveIntegerField('following', default=0)
+
+    class Meta:
+        verbose_name = 'UserStats'
+
+    def __str__(self):
+        return f'{self.user_id}: {self.posts_count}'
+
+
+class Recommendation(models.Model):
+    """Автор, которого стоит читать пользователю.
+
+    Строки без пользователя — самые популярные авторы, их видят
+    читатели без подписок.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True,
+                             related_name='recommendations')
+    author = models.ForeignKey(User, on_delete=models.CASCADE,
+                               related_name='recommended_to')
+    score = models.FloatField('score')
+
+    class Meta:
+        verbose_name = 'Recommendation'
+        indexes = [
+            models.Index(fields=('user', '-score'),
+                         name='recommendation_user_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id}: {self.author_id}'
+
+
+class TrendingPost(models.Model):
+    """Оценка популярности поста с затуханием во времени.
+
+    ``rank`` — логарифм оценки, приведённой к общему моменту отсчёта:
+    порядок по нему совпадает с порядком по текущей оценке, поэтому
+    лучшие посты читаются по индексу без пересчёта.
+    """
+    post = models.OneToOneField(Post, on_delete=models.CASCADE,
+                                primary_key=True, related_name='trend')
+    rank = models.FloatField('rank')
+
+    class Meta:
+        verbose_name = 'TrendingPost'
+        indexes = [
+            models.Index(fields=('rank', 'post'),
+                         name='trending_post_rank_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.post_id}: {self.rank}'
+
+
+class TrendingGroup(models.Model):
+    """Оценка популярности группы, как у ``TrendingPost``."""
+    group = models.OneToOneField(Group, on_delete=models.CASCADE,
+                                 primary_key=True, related_name='trend')
+    rank = models.FloatField('rank')
+
+    class Meta:
+        verbose_name = 'TrendingGroup'
+        indexes = [
+            models.Index(fields=('rank', 'group'),
+                         name='trending_group_rank_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.group_id}: {self.rank}'
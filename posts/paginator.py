@@ -0,0 +1,105 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db.models import Q
+
+
+class CursorPaginator(Paginator):
+    """Постраничный вывод по ключу сортировки вместо OFFSET и COUNT.
+
+    Страница выбирается непрозрачным токеном ``after``/``before``,
+    в котором закодированы значения полей сортировки крайнего объекта.
+    Стоимость любой страницы одинакова: это одно чтение по индексу.
+    Без ``ordering`` берётся сортировка выборки или модели, последнее
+    поле должно быть уникальным.
+    """
+    def __init__(self, object_list, per_page, ordering=None):
+        super().__init__(object_list, per_page)
+        self.ordering = (ordering or object_list.query.order_by
+                         or object_list.model._meta.ordering)
+        self.next_cursor = None
+        self.previous_cursor = None
+
+    @property
+    def num_pages(self):
+        """Известны только соседние страницы, общий размер не считаем."""
+        number = 2 if self.previous_cursor else 1
+        return number + 1 if self.next_cursor else number
+
+    def get_page(self, after=None, before=None):
+        """Страница после токена ``after`` или перед токеном ``before``."""
+        backwards = before is not None and after is None
+        position = self.decode(before if backwards else after)
+        queryset = self.object_list.order_by(
+            *self._ordering(backwards))
+        if position is not None:
+            queryset = queryset.filter(self._seek(position, backwards))
+        objects = list(queryset[:self.per_page + 1])
+        has_more = len(objects) > self.per_page
+        objects = objects[:self.per_page]
+        if position is not None and not objects:
+            return self.get_page()
+        if backwards:
+            objects.reverse()
+        has_next = True if backwards else has_more
+        has_previous = has_more if backwards else position is not None
+        self.next_cursor = self.encode(objects[-1]) if has_next else None
+        self.previous_cursor = (self.encode(objects[0])
+                                if has_previous else None)
+        return self._get_page(objects, 2 if has_previous else 1, self)
+
+    def encode(self, obj):
+        values = [getattr(obj, name) for name in self._fields()]
+        data = json.dumps(values, default=str).encode()
+        return urlsafe_b64encode(data).decode().rstrip('=')
+
+    def decode(self, token):
+        """Значения ключа из токена или None, если токен испорчен."""
+        if not token:
+            return None
+        try:
+            data = urlsafe_b64decode(token + '=' * (-len(token) % 4))
+            values = json.loads(data.decode())
+            fields = self._fields()
+            if not isinstance(values, list) or len(values) != len(fields):
+                return None
+            return [self._field(name).to_python(value)
+                    for name, value in zip(fields, values)]
+        except (ValueError, TypeError, ValidationError):
+            return None
+
+    def _field(self, name):
+        """Поле модели или аннотации выборки с таким именем."""
+        annotation = self.object_list.query.annotations.get(name)
+        if annotation is not None:
+            return annotation.output_field
+        return self.object_list.model._meta.get_field(name)
+
+    def _fields(self):
+        return [field.lstrip('-') for field in self.ordering]
+
+    def _ordering(self, backwards):
+        if not backwards:
+            return self.ordering
+        return [field[1:] if field.startswith('-') else '-' + field
+                for field in self.ordering]
+
+    def _seek(self, values, backwards):
+        """Условие «строго после позиции» в лексикографическом порядке.
+
+        Отдельная граница по первому полю позволяет базе начать чтение
+        индекса с позиции: без неё OR читается с начала индекса, и
+        дальние страницы дороже первой.
+        """
+        condition = Q()
+        fields = self._fields()
+        for index, field in enumerate(self.ordering):
+            descending = field.startswith('-') != backwards
+            lookup = f'{fields[index]}__{"lt" if descending else "gt"}'
+            equal = dict(zip(fields[:index], values[:index]))
+            condition |= Q(**equal, **{lookup: values[index]})
+        descending = self.ordering[0].startswith('-') != backwards
+        bound = f'{fields[0]}__{"lte" if descending else "gte"}'
+        return Q(**{bound: values[0]}) & condition
@@ -0,0 +1,178 @@
+"""Полнотекстовый поиск по постам, комментариям и группам.
+
+Индекс — виртуальная таблица SQLite FTS5 ``posts_search``, её держат в
+актуальном состоянии обработчики сигналов. В rowid закодированы вид
+документа и его id, поэтому запись обновляется без поиска по таблице.
+На других СУБД поиск сводится к ``icontains`` по тексту постов.
+"""
+import re
+from itertools import islice
+
+from django.db import connection
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Comment, Group, Post
+
+TABLE = 'posts_search'
+KINDS = {'post': 0, 'comment': 1, 'group': 2}
+# Сколько результатов вообще можно пролистать: счёт совпадений
+# частого слова по всему индексу стоил бы дороже самой выдачи.
+MAX_RESULTS = 1000
+SNIPPET_TOKENS = 24
+WORD = re.compile(r'\w+')
+HIGHLIGHT = ('\x02', '\x03')
+
+
+def is_available():
+    return connection.vendor == 'sqlite'
+
+
+def _rowid(kind, pk):
+    return pk * len(KINDS) + KINDS[kind]
+
+
+def _save(kind, pk, text, post_id):
+    if not is_available():
+        return
+    rowid = _rowid(kind, pk)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [rowid])
+        cursor.execute(
+            f'INSERT INTO {TABLE} (rowid, text, kind, object_id, post_id) '
+            'VALUES (%s, %s, %s, %s, %s)',
+            [rowid, text, kind, pk, post_id])
+
+
+def remove(kind, pk):
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s',
+                       [_rowid(kind, pk)])
+
+
+def index_post(post):
+    _save('post', post.pk, post.text, post.pk)
+
+
+def index_comment(comment):
+    _save('comment', comment.pk, comment.text, comment.post_id)
+
+
+def index_group(group):
+    _save('group', group.pk, f'{group.title}\n{group.description}', None)
+
+
+def _documents():
+    for post in Post.objects.only('text').iterator():
+        yield _rowid('post', post.pk), post.text, 'post', post.pk, post.pk
+    for comment in Comment.objects.only('text', 'post').iterator():
+        yield (_rowid('comment', comment.pk), comment.text, 'comment',
+               comment.pk, comment.post_id)
+    for group in Group.objects.iterator():
+        yield (_rowid('group', group.pk),
+               f'{group.title}\n{group.description}', 'group', group.pk, None)
+
+
+def rebuild(batch_size=1000):
+    """Заполняет индекс заново, возвращает число документов."""
+    if not is_available():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+        documents = _documents()
+        while True:
+            batch = list(islice(documents, batch_size))
+            if not batch:
+                break
+            cursor.executemany(
+                f'INSERT INTO {TABLE} (rowid, text, kind, object_id, '
+                'post_id) VALUES (%s, %s, %s, %s, %s)', batch)
+        cursor.execute(f"INSERT INTO {TABLE} ({TABLE}) VALUES ('optimize')")
+        cursor.execute(f'SELECT COUNT(*) FROM {TABLE}')
+        return cursor.fetchone()[0]
+
+
+def match_expression(query):
+    """Запрос FTS5 из слов пользователя: все слова, каждое как префикс."""
+    return ' '.join(f'"{word}"*' for word in WORD.findall(query.lower()))
+
+
+def highlight(snippet):
+    start, end = HIGHLIGHT
+    text = escape(snippet).replace(start, '<mark>').replace(end, '</mark>')
+    return mark_safe(text)
+
+
+class Hit:
+    """Найденный документ: пост, комментарий к посту или группа."""
+    def __init__(self, kind, snippet, post=None, group=None):
+        self.kind = kind
+        self.snippet = snippet
+        self.post = post
+        self.group = group
+
+
+class SearchResults:
+    """Ленивая выдача, которую можно отдать в Paginator."""
+    def __init__(self, query):
+        self.expression = match_expression(query)
+        self.query = query
+
+    def count(self):
+        if not self.expression:
+            return 0
+        if not is_available():
+            return min(self._fallback().count(), MAX_RESULTS)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM (SELECT 1 FROM {TABLE} '
+                f'WHERE {TABLE} MATCH %s LIMIT %s)',
+                [self.expression, MAX_RESULTS])
+            return cursor.fetchone()[0]
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        offset = index.start or 0
+        limit = index.stop - offset
+        if not self.expression or limit <= 0:
+            return []
+        if not is_available():
+            posts = self._fallback()[offset:index.stop]
+            return [Hit('post', escape(post.text), post=post)
+                    for post in posts]
+        return self._load(self._rows(offset, limit))
+
+    def _fallback(self):
+        return Post.objects.for_feed().filter(text__icontains=self.query)
+
+    def _rows(self, offset, limit):
+        start, end = HIGHLIGHT
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT kind, object_id, post_id, '
+                f'snippet({TABLE}, 0, %s, %s, %s, %s) '
+                f'FROM {TABLE} WHERE {TABLE} MATCH %s '
+                'ORDER BY rank LIMIT %s OFFSET %s',
+                [start, end, '…', SNIPPET_TOKENS, self.expression,
+                 limit, offset])
+            return cursor.fetchall()
+
+    def _load(self, rows):
+        """Подтягивает посты и группы найденных документов пачкой."""
+        post_ids = {post_id for _, _, post_id, _ in rows if post_id}
+        group_ids = {pk for kind, pk, _, _ in rows if kind == 'group'}
+        posts = Post.objects.for_feed().in_bulk(post_ids)
+        groups = Group.objects.in_bulk(group_ids)
+        hits = []
+        for kind, pk, post_id, snippet in rows:
+            hit = Hit(kind, highlight(snippet), post=posts.get(post_id),
+                      group=groups.get(pk) if kind == 'group' else None)
+            if hit.post or hit.group:
+                hits.append(hit)
+        return hits
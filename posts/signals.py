@@ -0,0 +1,122 @@
+from django.contrib.auth import get_user_model
+from django.core.signals import request_started
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from . import caching, counters, search, timeline, trending, usernames
+from .models import Comment, Follow, Group, Post, UserStats
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+def user_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(pre_save, sender=User)
+def user_saving(sender, instance, update_fields=None, raw=False, **kwargs):
+    if instance.pk and not raw and update_fields != {'last_login'}:
+        instance.previous_username = (
+            User.objects.filter(pk=instance.pk)
+            .values_list('username', flat=True).first())
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields=None, raw=False,
+               **kwargs):
+    # Вход меняет только last_login, страницы от этого не меняются.
+    if raw or update_fields == {'last_login'}:
+        return
+    usernames.forget(instance.username,
+                     getattr(instance, 'previous_username', None))
+    if not created:
+        caching.user_changed(instance)
+
+
+@receiver(request_started)
+def request_starting(sender, **kwargs):
+    counters.reset_deleting()
+
+
+@receiver(pre_delete, sender=User)
+def user_deleting(sender, instance, **kwargs):
+    counters.start_deleting(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    counters.finish_deleting(instance.pk)
+    usernames.forget(instance.username)
+
+
+@receiver(pre_save, sender=Post)
+def post_saving(sender, instance, **kwargs):
+    if instance.pk:
+        instance.previous_group_id = (
+            Post.objects.filter(pk=instance.pk)
+            .values_list('group_id', flat=True).first())
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.change_user(instance.author_id, posts_count=1)
+        timeline.fan_out(instance)
+    search.index_post(instance)
+    caching.post_changed(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.change_user(instance.author_id, posts_count=-1)
+    search.remove('post', instance.pk)
+    caching.post_changed(instance)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.change_comments(instance.post_id, 1)
+        trending.comment_added(instance)
+    search.index_comment(instance)
+    caching.comment_changed(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.change_comments(instance.post_id, -1)
+    search.remove('comment', instance.pk)
+    caching.comment_changed(instance)
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, **kwargs):
+    search.index_group(instance)
+    caching.group_changed(instance)
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleting(sender, instance, **kwargs):
+    search.remove('group', instance.pk)
+    caching.group_changed(instance)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        counters.change_user(instance.author_id, followers_count=1)
+        counters.change_user(instance.user_id, following_count=1)
+        timeline.backfill(instance)
+        trending.follow_added(instance)
+        caching.follow_changed(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.change_user(instance.author_id, followers_count=-1)
+    counters.change_user(instance.user_id, following_count=-1)
+    timeline.prune(instance)
+    caching.follow_changed(instance)
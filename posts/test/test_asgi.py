@@ -0,0 +1,104 @@
+import asyncio
+from io import BytesIO
+
+from django.test import SimpleTestCase
+from django.urls import reverse
+
+from yatube import asgi
+
+
+def echo(environ, start_response):
+    """WSGI-приложение, возвращающее путь, параметры и тело запроса."""
+    body = environ['wsgi.input'].read()
+    start_response('201 Created', [('Content-Type', 'text/plain'),
+                                   ('X-Path', environ['PATH_INFO'])])
+    return [environ['QUERY_STRING'].encode(), b'|', body]
+
+
+def call(application, scope, messages):
+    """Прогоняет запрос через ASGI-приложение, возвращает отправленное."""
+    sent = []
+    messages = iter(messages)
+
+    async def receive():
+        return next(messages)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(application(scope, receive, send))
+    return sent
+
+
+def http_scope(path, method='GET', **extra):
+    return {'type': 'http', 'method': method, 'path': path,
+            'query_string': b'', 'headers': [], **extra}
+
+
+class AsgiTest(SimpleTestCase):
+    """Проверка ASGI-входа поверх WSGI-приложения."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.adapter = asgi.WsgiToAsgi(echo, threads=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.adapter.executor.shutdown()
+        super().tearDownClass()
+
+    def test_build_environ(self):
+        """Заголовки, путь и параметры переводятся в WSGI-окружение."""
+        environ = asgi.build_environ(
+            http_scope('/группа/', query_string=b'q=1', headers=[
+                (b'content-type', b'text/plain'), (b'x-tag', b'a'),
+                (b'x-tag', b'b')]), BytesIO())
+        self.assertEqual(environ['PATH_INFO'].encode('latin-1').decode(),
+                         '/группа/')
+        self.assertEqual(environ['QUERY_STRING'], 'q=1')
+        self.assertEqual(environ['CONTENT_TYPE'], 'text/plain')
+        self.assertEqual(environ['HTTP_X_TAG'], 'a,b')
+
+    def test_request_body_in_parts(self):
+        """Тело из нескольких сообщений доходит до приложения целиком."""
+        sent = call(self.adapter,
+                    http_scope('/echo/', 'POST', query_string=b'x=1'),
+                    [{'type': 'http.request', 'body': b'ab',
+                      'more_body': True},
+                     {'type': 'http.request', 'body': b'cd'}])
+        self.assertEqual(sent[0]['status'], 201)
+        self.assertIn((b'x-path', b'/echo/'), sent[0]['headers'])
+        body = b''.join(message.get('body', b'') for message in sent[1:])
+        self.assertEqual(body, b'x=1|abcd')
+        self.assertFalse(sent[-1].get('more_body'))
+
+    def test_head_without_body(self):
+        """На HEAD отдаются только заголовки."""
+        sent = call(self.adapter, http_scope('/', 'HEAD'),
+                    [{'type': 'http.request'}])
+        self.assertEqual(sent[1:], [{'type': 'http.response.body',
+                                     'body': b''}])
+
+    def test_disconnect_before_body(self):
+        """Ушедший клиент не занимает поток."""
+        sent = call(self.adapter, http_scope('/', 'POST'),
+                    [{'type': 'http.disconnect'}])
+        self.assertEqual(sent, [])
+
+    def test_lifespan(self):
+        """Сервер получает ответы на запуск и остановку."""
+        adapter = asgi.WsgiToAsgi(echo, threads=1)
+        sent = call(adapter, {'type': 'lifespan'},
+                    [{'type': 'lifespan.startup'},
+                     {'type': 'lifespan.shutdown'}])
+        self.assertEqual([message['type'] for message in sent],
+                         ['lifespan.startup.complete',
+                          'lifespan.shutdown.complete'])
+
+    def test_django_page(self):
+        """Страница проекта отдаётся через ASGI-вход."""
+        sent = call(asgi.application, http_scope(reverse('about:author')),
+                    [{'type': 'http.request'}])
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertIn((b'content-type', b'text/html; charset=utf-8'),
+                      sent[0]['headers'])
@@ -0,0 +1,39 @@
+import json
+from io import StringIO
+
+from django.core.management import call_command
+from django.template import engines
+from django.test import SimpleTestCase
+
+from posts.management.commands.boot_profile import parse_import_times
+from yatube import boot
+
+
+class BootTest(SimpleTestCase):
+    """Проверка подготовки воркера к первому запросу."""
+    def test_warm_up_fills_template_cache(self):
+        """Шаблоны проекта разобраны до первого запроса."""
+        loader = engines.all()[0].engine.template_loaders[0]
+        loader.reset()
+        boot.warm_up()
+        for name in ('base.html', 'index.html', 'include/post_item.html'):
+            with self.subTest(name=name):
+                self.assertIn(name, loader.get_template_cache)
+
+    def test_parse_import_times(self):
+        """Время импорта переводится в миллисекунды."""
+        lines = ['import time: self [us] | cumulative | imported package',
+                 'import time:       250 |       1250 |   django.urls',
+                 'something else']
+        self.assertEqual(parse_import_times(lines),
+                         {'django.urls': (0.25, 1.25)})
+
+    def test_boot_profile_report(self):
+        """Отчёт содержит шаги запуска, приложения и пакеты."""
+        out = StringIO()
+        call_command('boot_profile', '--json', stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(list(report['phases']),
+                         ['settings', 'apps', 'urls', 'templates'])
+        self.assertIn('posts', report['apps'])
+        self.assertIn('django', report['packages'])
@@ -0,0 +1,202 @@
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, SimpleTestCase, TestCase
+from django.urls import reverse
+
+from posts import caching
+from posts.models import Comment, Post
+from yatube.cache import SQLiteCache
+
+from . import constants as con
+
+User = get_user_model()
+
+
+class SQLiteCacheTest(SimpleTestCase):
+    """Проверка общего кеша в файле SQLite."""
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.location = f'{self.directory}/cache.sqlite3'
+        self.cache = SQLiteCache(self.location, {})
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_set_get_delete(self):
+        """Запись, чтение, add и удаление значений."""
+        self.cache.set('key', {'value': 1})
+        self.assertEqual(self.cache.get('key'), {'value': 1})
+        self.assertFalse(self.cache.add('key', 2))
+        self.assertTrue(self.cache.add('other', 2))
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+        self.assertEqual(self.cache.incr('other', 3), 5)
+
+    def test_expired_value_is_missing(self):
+        """Истёкшее значение не читается и может быть добавлено снова."""
+        self.cache.set('key', 1, timeout=-1)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertTrue(self.cache.add('key', 2))
+
+    def test_shared_between_instances(self):
+        """Записи и сброс видны другому экземпляру на том же файле."""
+        other = SQLiteCache(self.location, {})
+        self.cache.set_many({'a': 1, 'b': 2})
+        self.assertEqual(other.get_many(['a', 'b', 'c']), {'a': 1, 'b': 2})
+        other.delete_many(['a'])
+        self.assertIsNone(self.cache.get('a'))
+
+
+class VersionsTest(TestCase):
+    """Проверка версий областей кеша."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=con.username)
+        cls.post = Post.objects.create(text=con.text, author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_comment_bumps_post_version(self):
+        """Комментарий меняет версию поста, но не автора."""
+        post_scope = f'post:{self.post.pk}'
+        author_scope = f'author:{self.user.pk}'
+        before = caching.get_versions(post_scope, author_scope)
+        self.assertEqual(caching.get_versions(post_scope, author_scope),
+                         before)
+        Comment.objects.create(post=self.post, author=self.user,
+                               text=con.text)
+        after = caching.get_versions(post_scope, author_scope)
+        self.assertNotEqual(after[0], before[0])
+        self.assertEqual(after[1], before[1])
+
+    def test_local_cache_versions_expire(self):
+        """В кеше одного процесса версии живут CACHE_LOCAL_TIMEOUT секунд."""
+        self.assertEqual(caching.timeout(caching.PAGE_TIMEOUT),
+                         settings.CACHE_LOCAL_TIMEOUT)
+        before = caching.get_versions('feed')
+        later = time.time() + settings.CACHE_LOCAL_TIMEOUT + 1
+        with mock.patch('time.time', return_value=later):
+            after = caching.get_versions('feed')
+        self.assertNotEqual(after, before)
+        with mock.patch.object(caching, 'is_shared', return_value=True):
+            self.assertEqual(caching.timeout(caching.PAGE_TIMEOUT),
+                             caching.PAGE_TIMEOUT)
+            caching.bump('feed')
+            bumped = caching.get_versions('feed')
+        with mock.patch('time.time', return_value=later * 2):
+            self.assertEqual(caching.get_versions('feed'), bumped)
+
+
+class ConditionalGetTest(TestCase):
+    """Проверка ответов 304 по версиям областей."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=con.username)
+        User.objects.create_user(username=con.another_username)
+        cls.post = Post.objects.create(text=con.text, author=cls.user)
+        cls.post_url = reverse('post', kwargs={'username': con.username,
+                                               'post_id': cls.post.id})
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.user)
+
+    def setUp(self):
+        cache.clear()
+
+    def revalidate(self, url, client=None):
+        client = client or self.client
+        etag = client.get(url)['ETag']
+        return etag, client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_not_modified_without_queries(self):
+        """Повторный запрос главной отвечает 304 без запросов к базе."""
+        etag = self.client.get(con.main_page)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(con.main_page,
+                                       HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertIn('Last-Modified', response)
+
+    def test_change_refreshes_page(self):
+        """Комментарий меняет ETag поста и страниц, где пост выведен."""
+        etag, response = self.revalidate(self.post_url)
+        self.assertEqual(response.status_code, 304)
+        etags = {url: self.client.get(url)['ETag']
+                 for url in (con.user_page, con.user_another_page)}
+        Comment.objects.create(post=self.post, author=self.user,
+                               text=con.text)
+        response = self.client.get(self.post_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        for url, status in ((con.user_page, 200),
+                            (con.user_another_page, 304)):
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etags[url])
+                self.assertEqual(response.status_code, status)
+
+    def test_anonymous_page_cached(self):
+        """Гость получает главную из кеша, пока её посты не менялись."""
+        self.client.get(con.main_page)
+        with self.assertNumQueries(0):
+            response = self.client.get(con.main_page)
+        self.assertContains(response, con.text)
+        Comment.objects.create(post=self.post, author=self.user,
+                               text=con.text)
+        response = self.client.get(con.main_page)
+        self.assertContains(response, 'Комментариев: 1')
+
+    def test_rename_refreshes_post_cards(self):
+        """После смены имени гость видит новую ссылку на автора."""
+        self.client.get(con.main_page)
+        user = User.objects.get(pk=self.user.pk)
+        user.username = 'RenamedUserTest'
+        user.save()
+        response = self.client.get(con.main_page)
+        self.assertContains(response, reverse('profile',
+                                              args=['RenamedUserTest']))
+        self.assertNotContains(response, con.user_page)
+
+    def test_stale_replica_page_not_cached(self):
+        """Страница из снимка старше изменений не кешируется и без ETag."""
+        with mock.patch.object(caching, 'replica_snapshot',
+                               return_value=time.time() - 60):
+            response = self.client.get(con.main_page)
+        self.assertNotIn('ETag', response)
+        with self.assertNumQueries(2):
+            self.client.get(con.main_page)
+        with mock.patch.object(caching, 'replica_snapshot',
+                               return_value=time.time() + 60):
+            response = self.client.get(con.main_page)
+        self.assertIn('ETag', response)
+        with self.assertNumQueries(0):
+            self.client.get(con.main_page)
+
+    def test_authorized_page_not_cached(self):
+        """Страница пользователя всегда отрисовывается заново."""
+        self.authorized_client.get(con.main_page)
+        Post.objects.filter(pk=self.post.pk).update(text=con.new_text)
+        cache.delete(caching.post_card_key(self.post.pk))
+        response = self.authorized_client.get(con.main_page)
+        self.assertContains(response, con.new_text)
+
+    def test_etag_depends_on_viewer(self):
+        """Страница гостя не подходит авторизованному пользователю."""
+        etag = self.client.get(self.post_url)['ETag']
+        response = self.authorized_client.get(self.post_url,
+                                              HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_unknown_page_not_found(self):
+        """Для несуществующего поста проверки нет."""
+        url = reverse('post', kwargs={'username': con.another_username,
+                                      'post_id': self.post.id})
+        response = self.client.get(url, HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, 404)
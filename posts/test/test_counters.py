@@ -0,0 +1,90 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import OperationalError, connection, transaction
+from django.test import TestCase
+
+from posts import counters, search
+from posts.models import Comment, Follow, Post, UserStats
+
+from . import constants as con
+
+User = get_user_model()
+
+
+class CountersTest(TestCase):
+    """Проверка хранимых счётчиков."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=con.username)
+        cls.author = User.objects.create_user(username=con.another_username)
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_comment_count(self):
+        """Число комментариев поста меняется при создании и удалении."""
+        post = Post.objects.create(text=con.text, author=self.author)
+        comment = Comment.objects.create(post=post, author=self.user,
+                                         text=con.text)
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 1)
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 0)
+
+    def test_posts_and_follow_counts(self):
+        """Счётчики постов и подписок автора и подписчика."""
+        post = Post.objects.create(text=con.text, author=self.author)
+        Follow.objects.create(user=self.user, author=self.author)
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.user).following_count, 1)
+        post.delete()
+        Follow.objects.filter(user=self.user).delete()
+        self.assertEqual(self.stats(self.author).posts_count, 0)
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.user).following_count, 0)
+
+    def test_delete_user_with_posts_and_follows(self):
+        """Удаление пользователя не создаёт заново его счётчики."""
+        user = User.objects.create_user(username='deleted')
+        Post.objects.create(text=con.text, author=user)
+        Follow.objects.create(user=user, author=self.author)
+        Follow.objects.create(user=self.user, author=user)
+        user_id = user.pk
+        user.delete()
+        connection.check_constraints()
+        self.assertFalse(UserStats.objects.filter(user_id=user_id).exists())
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.user).following_count, 0)
+
+    def test_failed_delete_forgotten_by_next_request(self):
+        """Прерванное удаление не отключает счётчики в следующих запросах."""
+        user = User.objects.create_user(username='deleted')
+        Post.objects.create(text=con.text, author=user)
+        busy = OperationalError('database is locked')
+        with mock.patch.object(search, 'remove', side_effect=busy):
+            with self.assertRaises(OperationalError):
+                with transaction.atomic():
+                    user.delete()
+        self.assertTrue(counters.deleting(user.pk))
+        self.client.get(con.main_page)
+        Post.objects.create(text=con.text, author=user)
+        self.assertEqual(self.stats(user).posts_count, 2)
+
+    def test_recount_repairs_drift(self):
+        """Команда recount исправляет разошедшиеся счётчики."""
+        post = Post.objects.create(text=con.text, author=self.author)
+        Comment.objects.create(post=post, author=self.user, text=con.text)
+        Post.objects.update(comment_count=7)
+        UserStats.objects.filter(user=self.author).update(posts_count=3)
+        UserStats.objects.filter(user=self.user).delete()
+        call_command('recount', stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 1)
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.stats(self.user).posts_count, 0)
@@ -0,0 +1,57 @@
+import json
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from posts.models import Comment, Follow, Post, TimelineEntry
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class DatasetTest(TestCase):
+    """Проверка генератора данных и замера маршрутов."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command('generate_dataset', users=20, groups=3, posts=200,
+                     comments=300, follows=60, image_pool=1, batch=50,
+                     stdout=StringIO())
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_dataset_generated(self):
+        """Данные созданы, производные таблицы собраны."""
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 300)
+        self.assertTrue(Follow.objects.exists())
+        self.assertTrue(TimelineEntry.objects.exists())
+        post = Post.objects.order_by('-comment_count').first()
+        self.assertEqual(post.comment_count, post.comments.count())
+
+    def test_authors_skewed(self):
+        """Первый по Ципфу автор пишет больше последнего."""
+        authors = list(Post.objects.order_by().values_list('author',
+                                                           flat=True))
+        first, last = min(authors), max(authors)
+        self.assertGreater(authors.count(first), authors.count(last))
+
+    def test_benchmark_report(self):
+        """Отчёт содержит все читающие маршруты с процентилями."""
+        output = StringIO()
+        call_command('benchmark', requests=2, warmup=0, stdout=output)
+        report = json.loads(output.getvalue())
+        self.assertIn('index', report['routes'])
+        self.assertIn('post_edit', report['routes'])
+        self.assertNotIn('post_delete', report['routes'])
+        for name, route in report['routes'].items():
+            with self.subTest(name=name):
+                self.assertEqual(route['status'], 200)
+                self.assertLessEqual(route['p50_ms'], route['p99_ms'])
@@ -1,11 +1,15 @@
+import os
 import shutil
 import tempfile
+from io import BytesIO
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.template.defaultfilters import filesizeformat
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 
 from posts.models import Group, Post
 
@@ -184,3 +188,63 @@ class CommentTest(TestCase):
                                           data=self.form_data,
                                           follow=True)
         self.assertRedirects(response, self.REDIRECT_login_URL)
+
+
+def png(size, noise=False):
+    """PNG заданного размера, с шумом плохо сжимается."""
+    image = Image.new('RGB', size)
+    if noise:
+        image.frombytes(os.urandom(size[0] * size[1] * 3))
+    buffer = BytesIO()
+    image.save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImageUploadTest(TestCase):
+    """Проверка ограничений потоковой загрузки картинок."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=con.username)
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.user)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def upload(self, content):
+        uploaded = SimpleUploadedFile(name=con.image_name, content=content,
+                                      content_type='image/png')
+        return self.authorized_client.post(
+            con.new_post, data={'text': con.text, 'image': uploaded})
+
+    @override_settings(IMAGE_UPLOAD_MAX_SIZE=2000)
+    def test_size_limit(self):
+        """Файл больше лимита отклоняется с ошибкой у поля."""
+        response = self.upload(png((100, 100), noise=True))
+        self.assertFormError(response, 'form', 'image',
+                             f'Файл больше {filesizeformat(2000)}.')
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(IMAGE_UPLOAD_MAX_PIXELS=100)
+    def test_pixels_limit(self):
+        """Число пикселей проверяется по заголовку файла."""
+        response = self.upload(png((20, 20)))
+        self.assertFormError(response, 'form', 'image',
+                             'Слишком большое изображение.')
+        self.assertFalse(Post.objects.exists())
+
+    def test_not_an_image(self):
+        """Файл без заголовка картинки отклоняется."""
+        response = self.upload(b'not an image' * 100)
+        self.assertFormError(response, 'form', 'image',
+                             'Загрузите правильное изображение.')
+
+    def test_valid_image(self):
+        """Подходящая картинка сохраняется."""
+        response = self.upload(png((20, 20)))
+        self.assertRedirects(response, con.main_page)
+        self.assertTrue(Post.objects.filter(image__endswith='.png').exists())
@@ -0,0 +1,61 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+from yatube.metrics import registry
+
+from . import constants as con
+
+User = get_user_model()
+
+
+class MetricsTest(TestCase):
+    """Проверка метрик запросов и страницы /metrics."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.guest_client = Client()
+        cls.user = User.objects.create_user(username=con.username)
+        cls.staff = User.objects.create_user(username=con.another_username,
+                                             is_staff=True)
+        cls.staff_client = Client()
+        cls.staff_client.force_login(cls.staff)
+        Post.objects.create(text=con.text, author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        registry.clear()
+
+    def test_metrics_forbidden(self):
+        """Без токена и прав персонала метрики недоступны."""
+        response = self.guest_client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 403)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_by_token(self):
+        """Метрики отдаются по токену."""
+        response = self.guest_client.get(
+            reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+
+    def test_request_recorded(self):
+        """Запрос к ленте попадает в гистограммы и счётчики кеша."""
+        self.guest_client.get(con.main_page)
+        self.guest_client.get(con.main_page)
+        body = self.staff_client.get(reverse('metrics')).content.decode()
+        for line in (
+            'yatube_request_duration_seconds_count{view="index"} 2',
+            'yatube_request_queries_bucket{view="index",le="+Inf"} 2',
+            'yatube_request_template_seconds_count{view="index"} 2',
+            'yatube_cache_requests_total{view="index",result="hit"}',
+            'yatube_cache_requests_total{view="index",result="miss"}',
+        ):
+            with self.subTest(line=line):
+                self.assertIn(line, body)
+
+    def test_unresolved_not_recorded(self):
+        """Несуществующие адреса не плодят метрики."""
+        self.guest_client.get('/no/such/page/here/')
+        self.assertFalse(registry.histograms)
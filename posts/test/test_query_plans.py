@@ -0,0 +1,136 @@
+import re
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import (Comment, Follow, Group, Post, TrendingGroup,
+                          TrendingPost)
+from posts.paginator import CursorPaginator
+
+from . import constants as con
+
+User = get_user_model()
+
+# Полный проход по таблице без индекса и сортировка во временном B-дереве.
+BAD_PLAN = re.compile(r'^SCAN \S+$|USE TEMP B-TREE')
+# Проход по индексу таблицы ленты с начала. На первой странице ленты без
+# фильтра это и есть чтение лучших строк, но страница после курсора
+# должна начинать чтение индекса с позиции курсора.
+FEED_SCAN = re.compile(r'^SCAN (posts_post|posts_comment|posts_timelineentry'
+                       r'|posts_trendingpost) USING (COVERING )?INDEX')
+# Поиск по индексу с границей курсора.
+CURSOR_SEARCH = re.compile(r'^SEARCH \S+ USING .*\((.* AND )?'
+                           r'(pub_date|created|rank)<\?\)')
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN из SQLite')
+class QueryPlanTest(TestCase):
+    """Запросы лент читают данные по индексам, без сортировки в памяти."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=con.username)
+        cls.author = User.objects.create_user(
+            username=con.another_username)
+        cls.group = Group.objects.create(title=con.group_name,
+                                         slug=con.group_slug,
+                                         description=con.description)
+        Follow.objects.create(user=cls.user, author=cls.author)
+        Post.objects.bulk_create(
+            Post(text=f'{con.text} {number}', author=cls.author,
+                 group=cls.group) for number in range(25))
+        cls.post = Post.objects.filter(author=cls.author).first()
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=cls.user, text=con.text)
+            for _ in range(25))
+        TrendingPost.objects.bulk_create(
+            TrendingPost(post=post, rank=post.pk % 5)
+            for post in Post.objects.all())
+        TrendingGroup.objects.create(group=cls.group, rank=1)
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.user)
+
+    def plan(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[3] for row in cursor.fetchall()]
+
+    def assert_plans(self, url):
+        """Проверяет планы всех SELECT, которые выполнила страница.
+
+        Страница после курсора должна искать по индексу от курсора.
+        """
+        with CaptureQueriesContext(connection) as context:
+            response = self.authorized_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        steps = []
+        for query in context.captured_queries:
+            if not query['sql'].startswith('SELECT'):
+                continue
+            for step in self.plan(query['sql']):
+                self.assertNotRegex(step, BAD_PLAN, query['sql'])
+                if 'after=' in url:
+                    self.assertNotRegex(step, FEED_SCAN, query['sql'])
+                    self.assertNotEqual(step, 'MULTI-INDEX OR', query['sql'])
+                steps.append(step)
+        if 'after=' in url:
+            self.assertTrue(any(CURSOR_SEARCH.match(step) for step in steps),
+                            steps)
+        return response
+
+    def test_feed_plans(self):
+        """Первая и следующая страницы лент и комментарии поста."""
+        urls = (
+            reverse('index'),
+            reverse('group', kwargs={'slug': con.group_slug}),
+            reverse('profile', kwargs={'username': con.another_username}),
+            reverse('follow_index'),
+            reverse('trending'),
+            reverse('post', kwargs={'username': con.another_username,
+                                    'post_id': self.post.id}),
+            reverse('post_comments', kwargs={'username': con.another_username,
+                                             'post_id': self.post.id}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.assert_plans(url)
+                name = 'page' if 'page' in response.context else 'comments'
+                paginator = response.context[name].paginator
+                cursor = getattr(paginator, 'next_cursor', None)
+                if cursor:
+                    self.assert_plans(f'{url}?after={cursor}')
+
+    def test_deep_cursor_plans(self):
+        """Дальняя страница ищет по индексу от курсора, а не с начала."""
+        posts = list(Post.objects.order_by('pub_date', 'id')[:2])
+        urls = (reverse('index'),
+                reverse('group', kwargs={'slug': con.group_slug}),
+                reverse('profile', kwargs={'username': con.another_username}))
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        cursor = paginator.encode(posts[1])
+        for url in urls:
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as context:
+                    self.assert_plans(f'{url}?after={cursor}')
+                feed = [query['sql'] for query in context.captured_queries
+                        if query['sql'].startswith('SELECT "posts_post"')]
+                self.assertIn('"posts_post"."pub_date" <= ', feed[0])
+
+    def test_pulled_follow_feed_plans(self):
+        """Лента подписок с автором без раскладки при записи."""
+        puller = User.objects.create_user(username='puller')
+        Follow.objects.create(user=self.user, author=puller)
+        Follow.objects.filter(user=self.user, author=puller).update(
+            fanout=False)
+        Post.objects.bulk_create(
+            Post(text=f'{con.text} {number}', author=puller)
+            for number in range(15))
+        url = reverse('follow_index')
+        response = self.assert_plans(url)
+        cursor = response.context['page'].paginator.next_cursor
+        self.assertTrue(cursor)
+        self.assert_plans(f'{url}?after={cursor}')
@@ -0,0 +1,143 @@
+import os
+import random
+import subprocess
+import sys
+from array import array
+from unittest import mock, skipIf
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, SimpleTestCase, TestCase
+from django.urls import reverse
+
+from posts import recommendations
+from posts.models import Follow, Recommendation
+
+from . import constants as con
+
+User = get_user_model()
+
+
+class GraphTest(SimpleTestCase):
+    """Проверка расчёта рекомендаций по графу подписок."""
+    # 1 читает 2, 2 читает 3; 4 тоже читает 2 и ещё 5.
+    edges = array('q', [1, 2, 2, 3, 4, 2, 4, 5])
+
+    def graphs(self):
+        graphs = [recommendations.PythonGraph(self.edges)]
+        if recommendations.load_numpy() is not None:
+            graphs.append(recommendations.NumpyGraph(self.edges))
+        return graphs
+
+    def test_friends_and_similar_readers(self):
+        """Друзья друзей и авторы похожих читателей, без своих авторов."""
+        for graph in self.graphs():
+            with self.subTest(graph=type(graph).__name__):
+                node = list(graph.ids).index(1)
+                self.assertEqual(graph.recommend(node, 5, 10),
+                                 [(3, 1.0), (5, 0.707107)])
+
+    def test_popular(self):
+        """Популярные авторы по числу читателей."""
+        for graph in self.graphs():
+            with self.subTest(graph=type(graph).__name__):
+                self.assertEqual(graph.popular(2), [(2, 2.0), (3, 1.0)])
+
+    def test_views_do_not_import_numpy(self):
+        """Загрузка view не импортирует NumPy."""
+        result = subprocess.run(
+            [sys.executable, '-c',
+             'import sys, django; django.setup(); import yatube.urls; '
+             'print("numpy" in sys.modules)'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True,
+            env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'yatube.settings'})
+        self.assertEqual(result.stdout.strip(), 'False', result.stderr)
+
+    @skipIf(recommendations.load_numpy() is None, 'NumPy не установлен')
+    def test_numpy_matches_python(self):
+        """Векторный расчёт совпадает с расчётом на списках."""
+        rnd = random.Random(1)
+        pairs = {(rnd.randrange(60), rnd.randrange(60)) for _ in range(600)}
+        edges = array('q', [user_id for pair in pairs if pair[0] != pair[1]
+                            for user_id in pair])
+        python = recommendations.PythonGraph(edges)
+        vectors = recommendations.NumpyGraph(edges)
+        self.assertEqual(list(python.readers()), list(vectors.readers()))
+        for node in python.readers():
+            self.assertEqual(python.recommend(node, 5, 8),
+                             vectors.recommend(node, 5, 8))
+
+
+class RecommendationsTest(TestCase):
+    """Проверка сохранённых рекомендаций и панели на страницах."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=con.username)
+        cls.friend = User.objects.create_user(username=con.another_username)
+        cls.author = User.objects.create_user(username='recommended')
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.user)
+        Follow.objects.create(user=cls.user, author=cls.friend)
+        Follow.objects.create(user=cls.friend, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def rebuild(self):
+        for engine in (recommendations.load_numpy(), None):
+            with mock.patch.object(recommendations, 'load_numpy',
+                                   return_value=engine):
+                recommendations.rebuild()
+                yield
+
+    def test_rebuild(self):
+        """Пересчёт сохраняет рекомендации и популярных авторов."""
+        for _ in self.rebuild():
+            self.assertEqual(
+                list(Recommendation.objects.filter(user=self.user)
+                     .values_list('author', 'score')),
+                [(self.author.pk, 1.0)])
+            self.assertEqual(
+                set(Recommendation.objects.filter(user=None)
+                    .values_list('author', flat=True)),
+                {self.friend.pk, self.author.pk})
+
+    def test_for_user(self):
+        """Свои рекомендации или популярные авторы, без подписок."""
+        recommendations.rebuild()
+        found = recommendations.for_user(self.user)
+        self.assertEqual([item.author for item in found], [self.author])
+        found = recommendations.for_user(self.author)
+        self.assertEqual([item.author for item in found], [self.friend])
+        Follow.objects.create(user=self.user, author=self.author)
+        self.assertEqual(recommendations.for_user(self.user), [])
+
+    def test_panel(self):
+        """Панель выводится в профиле и в ленте подписок."""
+        recommendations.rebuild()
+        urls = (reverse('profile', args=[self.friend.username]),
+                reverse('follow_index'))
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertEqual(
+                    [item.author for item in
+                     response.context['recommendations']],
+                    [self.author])
+                self.assertContains(
+                    response, reverse('profile_follow',
+                                      args=[self.author.username]))
+
+    def test_follow_refreshes_panel(self):
+        """После подписки страница профиля не отдаётся из старой версии."""
+        recommendations.rebuild()
+        url = reverse('profile', args=[self.friend.username])
+        response = self.authorized_client.get(url)
+        self.authorized_client.get(reverse('profile_follow',
+                                           args=[self.author.username]))
+        response = self.authorized_client.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['recommendations'], [])
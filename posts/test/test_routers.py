@@ -0,0 +1,120 @@
+import os
+import tempfile
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from posts.models import Post
+from yatube.routers import (STICKY_COOKIE, PrimaryReadCache,
+                            PrimaryReplicaRouter, ReplicaMiddleware,
+                            replica_snapshot, use_primary)
+
+User = get_user_model()
+router = PrimaryReplicaRouter()
+
+
+@override_settings(REPLICA_STICKY_SECONDS=10)
+class ReplicaRouterTest(SimpleTestCase):
+    """Проверка выбора базы для чтения и записи."""
+    def setUp(self):
+        self.factory = RequestFactory()
+        replica = tempfile.NamedTemporaryFile()
+        self.addCleanup(replica.close)
+        replicas = self.settings(DATABASE_REPLICAS={'replica': replica.name})
+        replicas.enable()
+        self.addCleanup(replicas.disable)
+
+    def run_request(self, view, request=None):
+        """Выполняет view через middleware, возвращает ответ и базы."""
+        used = []
+
+        def get_response(request):
+            used.append(router.db_for_read(Post))
+            view()
+            used.append(router.db_for_read(Post))
+            return HttpResponse()
+
+        response = ReplicaMiddleware(get_response)(
+            request or self.factory.get('/'))
+        return response, used
+
+    def test_reads_go_to_replica(self):
+        """Посты читаются с реплики, сессии и пользователи — нет."""
+        response, used = self.run_request(lambda: None)
+        self.assertEqual(used, ['replica', 'replica'])
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+        self.assertEqual(router.db_for_read(User), 'default')
+        self.assertEqual(router.db_for_read(Session), 'default')
+
+    def test_write_pins_request_and_sets_cookie(self):
+        """После записи запрос и следующие читают основную базу."""
+        response, used = self.run_request(
+            lambda: router.db_for_write(Post))
+        self.assertEqual(used, ['replica', 'default'])
+        self.assertIn(STICKY_COOKIE, response.cookies)
+        request = self.factory.get('/')
+        request.COOKIES[STICKY_COOKIE] = response.cookies[STICKY_COOKIE].value
+        _, used = self.run_request(lambda: None, request)
+        self.assertEqual(used, ['default', 'default'])
+
+    def test_expired_cookie_ignored(self):
+        """Устаревшая метка не закрепляет чтение за основной базой."""
+        request = self.factory.get('/')
+        request.COOKIES[STICKY_COOKIE] = str(time.time() - 1)
+        _, used = self.run_request(lambda: None, request)
+        self.assertEqual(used, ['replica', 'replica'])
+
+    def test_use_primary(self):
+        """Помеченный view читает основную базу, остальной запрос — нет."""
+        reads = []
+        view = use_primary(lambda: reads.append(router.db_for_read(Post)))
+        _, used = self.run_request(view)
+        self.assertEqual(reads, ['default'])
+        self.assertEqual(used, ['replica', 'replica'])
+
+    def test_missing_replica_falls_back_to_primary(self):
+        """Пока снимка реплики нет, чтение идёт из основной базы."""
+        with tempfile.TemporaryDirectory() as directory:
+            missing = os.path.join(directory, 'replica.sqlite3')
+            with self.settings(DATABASE_REPLICAS={'replica': missing}):
+                response, used = self.run_request(lambda: None)
+        self.assertEqual(used, ['default', 'default'])
+
+    def test_migrations_on_primary_only(self):
+        """Схема меняется только в основной базе."""
+        self.assertTrue(router.allow_migrate('default', 'posts'))
+        self.assertFalse(router.allow_migrate('replica', 'posts'))
+
+    def sticky_request(self):
+        request = self.factory.get('/')
+        request.COOKIES[STICKY_COOKIE] = str(time.time() + 10)
+        return request
+
+    def test_replica_snapshot(self):
+        """Запрос помнит время самого старого прочитанного снимка."""
+        snapshots = []
+
+        def view():
+            snapshots.append(replica_snapshot())
+
+        with tempfile.NamedTemporaryFile() as replica:
+            os.utime(replica.name, (1000, 1000))
+            with self.settings(DATABASE_REPLICAS={'replica': replica.name}):
+                self.run_request(view)
+                self.run_request(view, self.sticky_request())
+        self.assertEqual(snapshots, [1000, None])
+        self.assertIsNone(replica_snapshot())
+
+    def test_fragments_not_written_from_replica(self):
+        """Фрагменты, собранные из реплики, в кеш не попадают."""
+        fragments = PrimaryReadCache(None, {'OPTIONS': {'CACHE': 'default'}})
+        cache.clear()
+        self.run_request(lambda: fragments.set('read', 1))
+        self.run_request(lambda: fragments.set('written', 1),
+                         self.sticky_request())
+        self.assertIsNone(fragments.get('read'))
+        self.assertEqual(fragments.get('written'), 1)
@@ -0,0 +1,65 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Group, Post
+
+from . import constants as con
+
+User = get_user_model()
+
+
+class SearchTest(TestCase):
+    """Проверка полнотекстового поиска."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.guest_client = Client()
+        cls.user = User.objects.create_user(username=con.username)
+        cls.group = Group.objects.create(
+            title='Садоводы',
+            slug=con.group_slug,
+            description=con.description
+        )
+        cls.post = Post.objects.create(
+            text='Сегодня посадили яблони <b>во дворе</b>',
+            author=cls.user,
+            group=cls.group
+        )
+        cls.other_post = Post.objects.create(text=con.text, author=cls.user)
+        Comment.objects.create(post=cls.other_post, author=cls.user,
+                               text='Яблоки уже созрели')
+
+    def search(self, query):
+        response = self.guest_client.get(reverse('search'), {'q': query})
+        return response.context['page']
+
+    def test_search_posts_comments_groups(self):
+        """Находятся посты, комментарии и группы с подсветкой."""
+        hits = self.search('ябло')
+        self.assertEqual({(hit.kind, hit.post) for hit in hits},
+                         {('post', self.post), ('comment', self.other_post)})
+        self.assertEqual([hit.group for hit in self.search('садовод')],
+                         [self.group])
+        self.assertIn('<mark>яблони</mark>', hits[0].snippet
+                      + hits[1].snippet)
+
+    def test_snippet_is_escaped(self):
+        """Текст поста в подсветке экранируется."""
+        response = self.guest_client.get(reverse('search'),
+                                         {'q': 'дворе'})
+        self.assertContains(response, '&lt;b&gt;во <mark>дворе</mark>')
+
+    def test_index_follows_changes(self):
+        """Правка и удаление поста обновляют индекс."""
+        post = Post.objects.create(text='Сливы', author=self.user)
+        post.text = 'Груши'
+        post.save()
+        self.assertEqual([hit.post for hit in self.search('груш')], [post])
+        self.assertEqual(list(self.search('сливы')), [])
+        post.delete()
+        self.assertEqual(list(self.search('груш')), [])
+
+    def test_operators_in_query_are_ignored(self):
+        """Служебные символы FTS в запросе не ломают поиск."""
+        self.assertEqual(len(self.search('"ябло* (')), 2)
@@ -0,0 +1,61 @@
+from unittest import mock, skipUnless
+
+from django.db import OperationalError, connection
+from django.test import SimpleTestCase, TestCase
+
+from yatube.sqlite.retry import on_rollback, retry_on_busy
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Настройки бэкенда SQLite')
+class SQLiteBackendTest(TestCase):
+    """Проверка прагм и режима транзакций соединения."""
+    def test_pragmas(self):
+        """Соединение открыто с настроенными прагмами."""
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)
+            cursor.execute('PRAGMA temp_store')
+            self.assertEqual(cursor.fetchone()[0], 2)
+
+    def test_transaction_mode(self):
+        """Транзакции сразу берут блокировку записи."""
+        self.assertEqual(connection.transaction_mode, 'IMMEDIATE')
+
+
+@mock.patch('yatube.sqlite.retry.time.sleep')
+class RetryOnBusyTest(SimpleTestCase):
+    """Проверка повтора записи при занятой базе."""
+    def test_retries_busy(self, sleep):
+        """Занятая база — повтор, затем успешный ответ."""
+        view = mock.Mock(side_effect=[
+            OperationalError('database is locked'), 'ok'])
+        self.assertEqual(retry_on_busy(view)('request'), 'ok')
+        self.assertEqual(view.call_count, 2)
+        sleep.assert_called_once()
+
+    def test_gives_up(self, sleep):
+        """После всех попыток ошибка уходит наружу."""
+        view = mock.Mock(side_effect=OperationalError('database is locked'))
+        with self.assertRaises(OperationalError):
+            retry_on_busy(attempts=2)(view)('request')
+        self.assertEqual(view.call_count, 2)
+
+    def test_other_errors_not_retried(self, sleep):
+        """Прочие ошибки базы не повторяются."""
+        view = mock.Mock(side_effect=OperationalError('no such table'))
+        with self.assertRaises(OperationalError):
+            retry_on_busy(view)('request')
+        self.assertEqual(view.call_count, 1)
+
+    def test_rollback_callbacks(self, sleep):
+        """Перед повтором отменяются действия неудачной попытки."""
+        undone = []
+
+        def view(request):
+            on_rollback(lambda: undone.append(len(undone)))
+            if not undone:
+                raise OperationalError('database is locked')
+            return 'ok'
+
+        self.assertEqual(retry_on_busy(view)('request'), 'ok')
+        self.assertEqual(undone, [0])
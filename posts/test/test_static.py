@@ -0,0 +1,84 @@
+import gzip
+import os
+import shutil
+import tempfile
+
+from django.core.management import call_command
+from django.templatetags.static import static
+from django.test import SimpleTestCase, override_settings
+
+from yatube import staticfiles
+
+STYLE = 'body { color: #333; }\n' * 50
+
+
+class StaticFilesTest(SimpleTestCase):
+    """Проверка статики с хешами и сжатыми копиями."""
+    @classmethod
+    def setUpClass(cls):
+        cls.source = tempfile.mkdtemp()
+        cls.root = tempfile.mkdtemp()
+        os.makedirs(os.path.join(cls.source, 'css'))
+        with open(os.path.join(cls.source, 'css', 'site.css'), 'w') as css:
+            css.write(STYLE)
+        cls.settings = override_settings(
+            STATIC_ROOT=cls.root,
+            STATICFILES_DIRS=[cls.source],
+            STATICFILES_FINDERS=[
+                'django.contrib.staticfiles.finders.FileSystemFinder'])
+        cls.settings.enable()
+        super().setUpClass()
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.settings.disable()
+        shutil.rmtree(cls.source, ignore_errors=True)
+        shutil.rmtree(cls.root, ignore_errors=True)
+
+    def test_static_tag_uses_hashed_name(self):
+        """Ссылка на файл содержит хеш, рядом лежат сжатые копии."""
+        url = static('css/site.css')
+        self.assertRegex(url, r'^/static/css/site\.[0-9a-f]{12}\.css$')
+        path = os.path.join(self.root, url[len('/static/'):])
+        for extension, _, _ in staticfiles.compressors():
+            with self.subTest(extension=extension):
+                self.assertTrue(os.path.exists(path + extension))
+
+    def test_missing_file_keeps_name(self):
+        """Файл вне манифеста не ломает страницу."""
+        self.assertEqual(static('js/missing.js'), '/static/js/missing.js')
+
+    def test_serves_compressed_copy(self):
+        """Браузер с gzip получает сжатую копию, которую можно хранить год."""
+        response = self.client.get(static('css/site.css'),
+                                   HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertEqual(response['Cache-Control'], staticfiles.IMMUTABLE)
+        body = gzip.decompress(b''.join(response.streaming_content))
+        self.assertEqual(body.decode(), STYLE)
+
+    def test_refused_encoding_not_served(self):
+        """Кодировка с q=0 не используется."""
+        response = self.client.get(static('css/site.css'),
+                                   HTTP_ACCEPT_ENCODING='br;q=0, gzip;q=0')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(
+            staticfiles.accepted_encodings('gzip;q=0.5, br;q=0, *'),
+            {'gzip': 0.5, 'br': 0.0, '*': 1.0})
+
+    def test_serves_plain_copy(self):
+        """Без Accept-Encoding файл отдаётся как есть."""
+        response = self.client.get(static('css/site.css'))
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(b''.join(response.streaming_content).decode(),
+                         STYLE)
+
+    def test_revalidation_not_modified(self):
+        """Проверка свежести файла с хешем всегда даёт 304."""
+        response = self.client.get(
+            static('css/site.css'),
+            HTTP_IF_MODIFIED_SINCE='Thu, 01 Jan 2026 00:00:00 GMT')
+        self.assertEqual(response.status_code, 304)
@@ -0,0 +1,44 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+
+from posts import timeline
+from posts.models import Follow, Post, TimelineEntry
+
+from . import constants as con
+
+User = get_user_model()
+
+
+class TimelineTest(TestCase):
+    """Проверка готовой ленты подписок."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=con.username)
+        cls.author = User.objects.create_user(username=con.another_username)
+
+    def test_new_post_is_pushed_to_followers(self):
+        """Новый пост попадает в ленту подписчика."""
+        Follow.objects.create(user=self.user, author=self.author)
+        post = Post.objects.create(text=con.text, author=self.author)
+        self.assertTrue(TimelineEntry.objects.filter(user=self.user,
+                                                     post=post).exists())
+        self.assertEqual(list(timeline.feed(self.user)), [post])
+
+    def test_follow_backfills_and_unfollow_prunes(self):
+        """Подписка добавляет старые посты, отписка убирает."""
+        post = Post.objects.create(text=con.text, author=self.author)
+        Follow.objects.create(user=self.user, author=self.author)
+        self.assertEqual(list(timeline.feed(self.user)), [post])
+        Follow.objects.filter(user=self.user, author=self.author).delete()
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertFalse(timeline.feed(self.user).exists())
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_popular_author_is_read_on_request(self):
+        """Посты популярного автора читаются без раскладки."""
+        Follow.objects.create(user=self.user, author=self.author)
+        post = Post.objects.create(text=con.text, author=self.author)
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertFalse(Follow.objects.get(user=self.user).fanout)
+        self.assertEqual(list(timeline.feed(self.user)), [post])
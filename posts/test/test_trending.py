@@ -0,0 +1,102 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts import trending
+from posts.models import (Comment, Follow, Group, Post, TrendingGroup,
+                          TrendingPost)
+
+from . import constants as con
+
+User = get_user_model()
+
+
+@override_settings(TRENDING_HALF_LIFE=3600)
+class TrendingTest(TestCase):
+    """Проверка оценок популярности постов и групп."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=con.username)
+        cls.author = User.objects.create_user(username=con.another_username)
+        cls.group = Group.objects.create(title=con.group_name,
+                                         slug=con.group_slug,
+                                         description=con.description)
+        cls.old = Post.objects.create(text=con.text, author=cls.author)
+        cls.new = Post.objects.create(text=con.text, author=cls.author,
+                                      group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_events_update_scores(self):
+        """Комментарий и подписка добавляют вес посту и его группе."""
+        now = time.time()
+        Comment.objects.create(post=self.new, author=self.user,
+                               text=con.text)
+        Follow.objects.create(user=self.user, author=self.author)
+        rank = TrendingPost.objects.get(post=self.new).rank
+        self.assertAlmostEqual(trending.score(rank, now), 4, places=2)
+        rank = TrendingGroup.objects.get(group=self.group).rank
+        self.assertAlmostEqual(trending.score(rank, now), 4, places=2)
+        self.assertFalse(TrendingPost.objects.filter(post=self.old).exists())
+
+    def test_decay(self):
+        """Вклад события убывает вдвое за период полураспада."""
+        now = time.time()
+        trending.post_event(self.old.pk, None, 2, now - 3600)
+        trending.post_event(self.new.pk, None, 1, now)
+        trending.post_event(self.new.pk, None, 1, now - 7200)
+        ranks = dict(TrendingPost.objects.values_list('post', 'rank'))
+        self.assertAlmostEqual(trending.score(ranks[self.old.pk], now), 1)
+        self.assertAlmostEqual(trending.score(ranks[self.new.pk], now), 1.25)
+        self.assertEqual(list(trending.posts()), [self.new, self.old])
+
+    @override_settings(TRENDING_SIZE=1, TRENDING_MIN_SCORE=0.5)
+    def test_compact(self):
+        """Сжатие удаляет угасшие строки и оставляет лучшие."""
+        now = time.time()
+        trending.post_event(self.old.pk, None, 1, now - 3 * 3600)
+        trending.post_event(self.new.pk, self.group.pk, 1, now)
+        post = Post.objects.create(text=con.text, author=self.author)
+        trending.post_event(post.pk, None, 2, now)
+        self.assertEqual(trending.compact(now), 2)
+        self.assertEqual(list(trending.posts()), [post])
+        self.assertEqual(trending.groups(), [self.group])
+
+    def test_pages(self):
+        """Лента популярного и панель популярных групп."""
+        Comment.objects.create(post=self.new, author=self.user,
+                               text=con.text)
+        response = self.client.get(reverse('trending'))
+        self.assertEqual(list(response.context['page']), [self.new])
+        for url in (reverse('trending'), reverse('index')):
+            with self.subTest(url=url):
+                cache.clear()
+                response = self.client.get(url)
+                self.assertEqual(response.context['trending_groups'],
+                                 [self.group])
+                self.assertContains(response, reverse('group',
+                                                      args=[con.group_slug]))
+
+    def test_events_refresh_pages(self):
+        """Событие обновляет ленту популярного, но не чаще TRENDING_REFRESH."""
+        url = reverse('trending')
+        etag = self.client.get(url)['ETag']
+        Comment.objects.create(post=self.new, author=self.user,
+                               text=con.text)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['page']), [self.new])
+        etag = response['ETag']
+        trending.post_event(self.old.pk, None, 5)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        cache.delete(trending.REFRESH_KEY)
+        trending.post_event(self.old.pk, None, 5)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(list(response.context['page']),
+                         [self.old, self.new])
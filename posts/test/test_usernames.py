@@ -0,0 +1,83 @@
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import usernames
+
+from . import constants as con
+
+User = get_user_model()
+
+
+class UsernamesTest(TestCase):
+    """Проверка кеша имён пользователей."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=con.username)
+        cls.guest_client = Client()
+
+    def setUp(self):
+        cache.clear()
+        usernames.local.clear()
+
+    def test_lookup_is_cached(self):
+        """Повторный поиск не обращается к базе, даже из другого процесса."""
+        record = usernames.lookup(con.username)
+        self.assertEqual(record, (self.user.pk, con.username))
+        with self.assertNumQueries(0):
+            self.assertEqual(usernames.lookup(con.username), record)
+            usernames.local.clear()
+            self.assertEqual(usernames.lookup(con.username), record)
+
+    def test_missing_is_cached(self):
+        """Запросы к несуществующему профилю не доходят до базы."""
+        url = reverse('profile', args=[con.another_username])
+        self.assertEqual(self.guest_client.get(url).status_code, 404)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.guest_client.get(url).status_code, 404)
+
+    def test_created_user_is_found(self):
+        """Регистрация сбрасывает отметку об отсутствии имени."""
+        self.assertIsNone(usernames.lookup(con.another_username))
+        user = User.objects.create_user(username=con.another_username)
+        self.assertEqual(usernames.lookup(con.another_username).pk, user.pk)
+
+    def test_rename_and_delete(self):
+        """Переименование и удаление сбрасывают имена."""
+        user = User.objects.get(pk=self.user.pk)
+        usernames.lookup(con.username)
+        user.username = con.another_username
+        user.save()
+        self.assertIsNone(usernames.lookup(con.username))
+        self.assertEqual(usernames.lookup(con.another_username).pk, user.pk)
+        user.delete()
+        self.assertIsNone(usernames.lookup(con.another_username))
+
+    @override_settings(USERNAME_CACHE_SIZE=1)
+    def test_local_cache_is_bounded(self):
+        """Память процесса хранит не больше USERNAME_CACHE_SIZE имён."""
+        User.objects.create_user(username=con.another_username)
+        usernames.lookup(con.username)
+        usernames.lookup(con.another_username)
+        self.assertEqual(list(usernames.local.entries),
+                         [usernames.cache_key(con.another_username)])
+
+    def test_missing_expires_in_local_cache(self):
+        """В кеше одного процесса отсутствие имени помнится недолго."""
+        later = time.time() + settings.USERNAME_CACHE_LOCAL_TIMEOUT + 1
+        usernames.lookup(con.another_username)
+        with mock.patch('time.time', return_value=later):
+            with self.assertNumQueries(1):
+                usernames.lookup(con.another_username)
+        cache.clear()
+        with mock.patch.object(usernames, 'is_shared', return_value=True):
+            usernames.lookup(con.another_username)
+        with mock.patch('time.time', return_value=later):
+            with self.assertNumQueries(0):
+                usernames.lookup(con.another_username)
@@ -1,17 +1,23 @@
 import shutil
 import tempfile
+from unittest import mock
 
 from django import forms
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
+from django.core.files.storage import default_storage
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.paginator import Paginator
+from django.db import OperationalError, connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from posts.models import Group, Post
-from yatube.settings import paginator_count
+from posts import images, search, usernames
+from posts.models import Comment, Follow, Group, Post
+from posts.paginator import CursorPaginator
+from yatube.settings import comments_per_page, paginator_count
 
 from . import constants as con
 
@@ -188,6 +194,43 @@ class PaginatorViewsTest(TestCase):
         response = self.authorized_client.get(con.main_page + '?page=2')
         self.assertEqual(len(response.context.get('page').object_list), 3)
 
+    def test_cursor_pages_walk_forward_and_back(self):
+        """Листание по ключу вперёд и назад отдаёт те же посты."""
+        cache.clear()
+        response = self.authorized_client.get(con.main_page)
+        first_page = response.context.get('page')
+        self.assertEqual(len(first_page), paginator_count)
+        self.assertFalse(first_page.has_previous())
+        response = self.authorized_client.get(
+            con.main_page, {'after': first_page.paginator.next_cursor})
+        second_page = response.context.get('page')
+        self.assertEqual(len(second_page), 3)
+        self.assertFalse(second_page.has_next())
+        self.assertEqual(list(first_page) + list(second_page),
+                         list(Post.objects.all()))
+        response = self.authorized_client.get(
+            con.main_page, {'before': second_page.paginator.previous_cursor})
+        self.assertEqual(list(response.context.get('page')),
+                         list(first_page))
+
+    def test_cursor_page_cost_does_not_depend_on_depth(self):
+        """Дальняя страница стоит столько же запросов, сколько первая."""
+        first_page = CursorPaginator(Post.objects.all(),
+                                     paginator_count).get_page()
+        cursor = first_page.paginator.next_cursor
+        with self.assertNumQueries(1):
+            CursorPaginator(Post.objects.all(), paginator_count).get_page()
+        with self.assertNumQueries(1):
+            CursorPaginator(Post.objects.all(),
+                            paginator_count).get_page(after=cursor)
+
+    def test_broken_cursor_shows_first_page(self):
+        """Испорченный токен открывает первую страницу."""
+        cache.clear()
+        response = self.authorized_client.get(con.main_page,
+                                              {'after': 'broken'})
+        self.assertEqual(len(response.context.get('page')), paginator_count)
+
 
 class CacheTest(TestCase):
     """Проверка кеширования страниц."""
@@ -210,21 +253,47 @@ class CacheTest(TestCase):
             image=uploaded
         )
 
+    def setUp(self):
+        cache.clear()
+        usernames.local.clear()
+
     def test_cahe_index_page(self):
-        """Страница index кешируется."""
-        response = self.authorized_client.get(con.main_page)
-        self.post = Post.objects.create(
-            text=con.new_text,
+        """Карточка поста кешируется, новый пост виден сразу."""
+        self.authorized_client.get(con.main_page)
+        Post.objects.filter(pk=self.post.pk).update(text=con.new_text)
+        response_cache = self.authorized_client.get(con.main_page)
+        self.assertNotContains(response_cache, con.new_text)
+        new_post = Post.objects.create(
+            text=con.new_text + 'Fresh',
             author=self.user,
-            group=self.group,
-            image=uploaded
+            group=self.group
         )
-        response_cache = self.authorized_client.get(con.main_page)
-        self.assertEqual(response.content, response_cache.content)
+        response = self.authorized_client.get(con.main_page)
+        self.assertContains(response, new_post.text)
         cache.clear()
         response_cache_clear = self.authorized_client.get(con.main_page)
-        self.assertNotEqual(response_cache_clear.content,
-                            response_cache.content)
+        self.assertContains(response_cache_clear, con.new_text, count=2)
+
+    def test_post_card_invalidated_on_change(self):
+        """Кеш карточки сбрасывается при правке поста и комментарии."""
+        self.authorized_client.get(con.main_page)
+        self.post.text = con.new_text
+        self.post.save()
+        response = self.authorized_client.get(con.main_page)
+        self.assertContains(response, con.new_text)
+        Comment.objects.create(post=self.post, author=self.user,
+                               text=con.text)
+        response = self.authorized_client.get(con.main_page)
+        self.assertContains(response, 'Комментариев: 1')
+
+    def test_user_links_not_cached(self):
+        """Ссылки автора не попадают к другим пользователям."""
+        edit_url = reverse('post_edit', kwargs={
+            'username': self.user.username, 'post_id': self.post.id})
+        response = self.authorized_client.get(con.main_page)
+        self.assertContains(response, edit_url)
+        response = self.guest_client.get(con.main_page)
+        self.assertNotContains(response, edit_url)
 
 
 class FollowTest(TestCase):
@@ -289,4 +358,242 @@ class FollowTest(TestCase):
             {'text': con.text},
             follow=True)
         response = self.authorized_client.get(reverse('follow_index'))
-        self.assertFalse(response.context.get('page').object_list.exists())
+        self.assertFalse(response.context.get('page').object_list)
+
+
+class FeedQueriesTest(TestCase):
+    """Проверка числа запросов при выводе лент."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=con.username)
+        cls.another_user = User.objects.create_user(
+            username=con.another_username)
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.user)
+        cls.group = Group.objects.create(
+            title=con.group_name,
+            slug=con.group_slug,
+            description=con.description
+        )
+        Follow.objects.create(user=cls.user, author=cls.another_user)
+        cls.post = cls.add_posts(1)[0]
+
+    @classmethod
+    def add_posts(cls, count):
+        """Посты автора в группе, под каждым комментарий."""
+        posts = [Post.objects.create(text=con.text + str(i),
+                                     author=cls.another_user,
+                                     group=cls.group)
+                 for i in range(count)]
+        Comment.objects.bulk_create(
+            Comment(post=post, author=cls.user, text=con.text)
+            for post in posts)
+        return posts
+
+    def setUp(self):
+        cache.clear()
+        usernames.local.clear()
+
+    def count_queries(self, url):
+        self.setUp()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.authorized_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_feed_query_budget(self):
+        """Число запросов ленты не зависит от числа постов на странице."""
+        feeds_queries = {
+            con.main_page: 4,
+            con.group_page: 4,
+            con.user_another_page: 8,
+            reverse('follow_index'): 6,
+            reverse('post', kwargs={'username': con.another_username,
+                                    'post_id': self.post.id}): 6,
+        }
+        single = {url: self.count_queries(url) for url in feeds_queries}
+        # Полная страница постов и комментарии других читателей.
+        self.add_posts(paginator_count * 2)
+        Comment.objects.bulk_create(
+            Comment(post=self.post, author=self.another_user, text=con.text)
+            for _ in range(comments_per_page))
+        for url, queries in feeds_queries.items():
+            with self.subTest(url=url):
+                self.assertEqual(single[url], queries)
+                self.assertEqual(self.count_queries(url), queries)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class PictureTest(TestCase):
+    """Проверка фоновой подготовки вариантов картинки."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.guest_client = Client()
+        cls.user = User.objects.create_user(username=con.username)
+        cls.post = Post.objects.create(
+            text=con.text,
+            author=cls.user,
+            image=SimpleUploadedFile(name=con.image_name,
+                                     content=small_gif,
+                                     content_type='image/gif')
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        usernames.local.clear()
+
+    def test_placeholder_until_variants_ready(self):
+        """Пока вариантов нет, страница показывает заглушку."""
+        response = self.guest_client.get(con.main_page)
+        self.assertContains(response, 'Картинка обрабатывается')
+        images.generate(self.post.pk, self.post.image.name)
+        self.post.refresh_from_db()
+        picture = self.post.picture
+        response = self.guest_client.get(con.main_page)
+        self.assertNotContains(response, 'Картинка обрабатывается')
+        self.assertContains(response, picture.webp_srcset)
+        self.assertContains(response, picture.srcset)
+
+    def test_variants_saved_next_to_image(self):
+        """Маленькая картинка даёт один вариант в WebP и в формате файла."""
+        images.generate(self.post.pk, self.post.image.name)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.image_widths, '320')
+        for extension in ('png', 'webp'):
+            name = images.variant_name(self.post.image.name, 320, extension)
+            with self.subTest(name=name):
+                self.assertTrue(name.startswith('posts/variants/'))
+                self.assertTrue(default_storage.exists(name))
+
+    def test_widths_for_large_image(self):
+        """Ширины вариантов не превышают ширину исходной картинки."""
+        self.assertEqual(images.widths_for(1000), [320, 640, 960])
+        self.assertEqual(images.widths_for(4000), list(images.WIDTHS))
+
+    def test_edit_rebuilds_only_new_image(self):
+        """Правка текста не трогает варианты, замена картинки их удаляет."""
+        client = Client()
+        client.force_login(self.user)
+        url = reverse('post_edit', kwargs={'username': con.username,
+                                           'post_id': self.post.id})
+        images.generate(self.post.pk, self.post.image.name)
+        variant = images.variant_name(self.post.image.name, 320, 'webp')
+        commit_now = mock.patch.object(images.transaction, 'on_commit',
+                                       lambda callback: callback())
+        with commit_now, mock.patch.object(images, 'schedule') as schedule:
+            client.post(url, {'text': con.new_text})
+            schedule.assert_not_called()
+            self.assertTrue(default_storage.exists(variant))
+            client.post(url, {'text': con.new_text,
+                              'image': SimpleUploadedFile(
+                                  name=con.image_name_crash,
+                                  content=small_gif,
+                                  content_type='image/gif')})
+            schedule.assert_called_once()
+        self.assertFalse(default_storage.exists(variant))
+
+    def test_failed_save_removes_upload(self):
+        """Картинка неудачной попытки не остаётся в хранилище."""
+        client = Client()
+        client.force_login(self.user)
+        busy = OperationalError('database is locked')
+        with mock.patch.object(search, 'index_post', side_effect=busy):
+            with self.assertRaises(OperationalError):
+                client.post(con.new_post, {
+                    'text': con.text,
+                    'image': SimpleUploadedFile(name='failed.gif',
+                                                content=small_gif,
+                                                content_type='image/gif')})
+        self.assertFalse(default_storage.exists('posts/failed.gif'))
+
+    def test_pending_until_variants_ready(self):
+        """Пост ждёт воркера, пока у картинки нет вариантов."""
+        self.assertIn(self.post, images.pending())
+        images.generate(self.post.pk, self.post.image.name)
+        self.assertNotIn(self.post, images.pending())
+
+
+class CommentsTest(TestCase):
+    """Комментарии поста подгружаются порциями."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=con.username)
+        cls.another_user = User.objects.create_user(
+            username=con.another_username, first_name='Имя')
+        cls.post = Post.objects.create(text=con.text, author=cls.user)
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=cls.another_user,
+                    text=f'{con.text} {number}')
+            for number in range(comments_per_page * 2 + 5))
+        cls.comments_url = reverse('post_comments',
+                                   kwargs={'username': con.username,
+                                           'post_id': cls.post.id})
+        cls.post_url = reverse('post', kwargs={'username': con.username,
+                                               'post_id': cls.post.id})
+
+    def setUp(self):
+        cache.clear()
+        usernames.local.clear()
+
+    def test_post_page_shows_first_chunk(self):
+        """Пост показывает первую порцию и кнопку со ссылкой на следующую."""
+        response = self.client.get(self.post_url)
+        page = response.context['comments']
+        self.assertEqual(len(page), comments_per_page)
+        cursor = page.paginator.next_cursor
+        self.assertContains(response, f'{self.comments_url}?after={cursor}')
+
+    def test_chunks_cover_all_comments(self):
+        """Порции по курсору идут без пропусков и повторов."""
+        ids, cursor = [], ''
+        for _ in range(Comment.objects.count()):
+            data = self.client.get(self.comments_url,
+                                   {'format': 'json', 'after': cursor}).json()
+            ids += [comment['id'] for comment in data['comments']]
+            cursor = data['next']
+            if cursor is None:
+                break
+        expected = list(self.post.comments.order_by('-created', '-id')
+                        .values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_fragment_query_count(self):
+        """Порция — три запроса при любом числе комментариев."""
+        with self.assertNumQueries(3):
+            response = self.client.get(self.comments_url)
+        self.assertTemplateUsed(response, 'include/comment_list.html')
+        self.assertContains(response, 'Имя', count=comments_per_page)
+
+    def test_json_comment_fields(self):
+        """В JSON есть автор и текст комментария."""
+        response = self.client.get(self.comments_url, {'format': 'json'})
+        comment = response.json()['comments'][0]
+        self.assertEqual(comment['author'], con.another_username)
+        self.assertEqual(comment['author_name'], 'Имя')
+
+    def test_format_is_part_of_cache_key(self):
+        """Кешированный HTML не отдаётся вместо JSON и наоборот."""
+        html = self.client.get(self.comments_url)
+        self.assertTemplateUsed(html, 'include/comment_list.html')
+        response = self.client.get(self.comments_url,
+                                   HTTP_ACCEPT='application/json')
+        self.assertEqual(response['Content-Type'], html['Content-Type'])
+        response = self.client.get(self.comments_url, {'format': 'json'},
+                                   HTTP_IF_NONE_MATCH=html['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/json')
+
+    def test_unknown_post(self):
+        """Для чужого автора порции нет."""
+        url = reverse('post_comments',
+                      kwargs={'username': con.another_username,
+                              'post_id': self.post.id})
+        self.assertEqual(self.client.get(url).status_code, 404)
@@ -0,0 +1,118 @@
+"""Популярные посты и группы с затуханием по времени.
+
+Каждое событие — новый комментарий или подписка на автора — добавляет
+к оценке поста и его группы свой вес, и этот вклад убывает вдвое за
+``TRENDING_HALF_LIFE`` секунд. Оценка хранится как логарифм суммы
+вкладов, приведённых к общему моменту отсчёта:
+
+    rank = ln(Σ weight · 2 ** (time / half_life))
+
+Текущая оценка равна ``exp(rank)``, умноженной на одно и то же для всех
+строк число, поэтому порядок по ``rank`` — это порядок по текущей
+оценке, и лучшие строки читаются по индексу за O(log n). Событие
+меняет одну строку, комментарии заново не перебираются.
+
+Страницы с популярным обновляются после событий, но не чаще раза в
+``TRENDING_REFRESH`` секунд: иначе каждый комментарий сбрасывал бы
+главную. ``manage.py compact_trending`` удаляет угасшие строки и
+оставляет не больше ``TRENDING_SIZE`` лучших, после чего страницы тоже
+обновляются.
+"""
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Q
+
+from . import caching
+from .models import Group, Post, TrendingGroup, TrendingPost
+
+SCOPE = 'trending'
+# Отметка в кеше: страницы популярного недавно обновлялись.
+REFRESH_KEY = 'trending:refreshed'
+
+
+def moment(now=None):
+    """Время в логарифмической шкале оценок."""
+    now = time.time() if now is None else now
+    return now * math.log(2) / settings.TRENDING_HALF_LIFE
+
+
+def score(rank, now=None):
+    """Текущая оценка строки по её ``rank``."""
+    return math.exp(rank - moment(now))
+
+
+def log_add(first, second):
+    """ln(exp(first) + exp(second)) без переполнения."""
+    high, low = max(first, second), min(first, second)
+    return high + math.log1p(math.exp(low - high))
+
+
+def refresh():
+    """Обновляет страницы популярного, если они давно не обновлялись."""
+    if cache.add(REFRESH_KEY, True, settings.TRENDING_REFRESH):
+        caching.bump(SCOPE)
+
+
+@transaction.atomic
+def add(model, pk, weight, now=None):
+    """Добавляет вес события к оценке строки ``model`` с ключом ``pk``."""
+    gain = math.log(weight) + moment(now)
+    trend, created = (model.objects.select_for_update()
+                      .get_or_create(pk=pk, defaults={'rank': gain}))
+    if not created:
+        trend.rank = log_add(trend.rank, gain)
+        trend.save(update_fields=['rank'])
+    refresh()
+
+
+def post_event(post_id, group_id, weight, now=None):
+    add(TrendingPost, post_id, weight, now)
+    if group_id is not None:
+        add(TrendingGroup, group_id, weight, now)
+
+
+def comment_added(comment, now=None):
+    post_event(comment.post_id, comment.post.group_id,
+               settings.TRENDING_COMMENT_WEIGHT, now)
+
+
+def follow_added(follow, now=None):
+    """Подписка поднимает последний пост автора: он привёл читателя."""
+    post = (Post.objects.filter(author_id=follow.author_id)
+            .values_list('pk', 'group_id').first())
+    if post is not None:
+        post_event(*post, settings.TRENDING_FOLLOW_WEIGHT, now)
+
+
+def posts():
+    """Посты по убыванию оценки."""
+    return (Post.objects.filter(trend__isnull=False)
+            .annotate(trend_rank=F('trend__rank'),
+                      trend_post=F('trend__post'))
+            .order_by('-trend_rank', '-trend_post'))
+
+
+def groups(count=None):
+    count = count or settings.TRENDING_GROUPS
+    return list(Group.objects.filter(trend__isnull=False)
+                .order_by('-trend__rank', '-trend__group')[:count])
+
+
+def compact(now=None):
+    """Удаляет угасшие и лишние строки, возвращает число удалённых."""
+    floor = moment(now) + math.log(settings.TRENDING_MIN_SCORE)
+    deleted = 0
+    for model in (TrendingPost, TrendingGroup):
+        deleted += model.objects.filter(rank__lt=floor).delete()[0]
+        last = (model.objects.order_by('-rank', '-pk')
+                .values_list('rank', 'pk')
+                [settings.TRENDING_SIZE:settings.TRENDING_SIZE + 1])
+        for rank, pk in last:
+            deleted += model.objects.filter(
+                Q(rank__lt=rank) | Q(rank=rank, pk__lte=pk)).delete()[0]
+    caching.bump(SCOPE)
+    return deleted
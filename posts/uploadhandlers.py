@@ -0,0 +1,100 @@
+"""Потоковая загрузка картинок с ограничениями.
+
+Файл сразу пишется во временный файл на диске, а пока он приходит,
+проверяются размер в байтах и, по заголовку, формат и число пикселей.
+Неподходящий файл дальше не пишется: форма получает ``RejectedUpload``
+с текстом ошибки и показывает её у поля картинки.
+"""
+import math
+import warnings
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.template.defaultfilters import filesizeformat
+
+# Сколько первых байт файла держать в памяти ради заголовка.
+HEADER_BYTES = 256 * 2 ** 10
+
+
+class RejectedUpload(UploadedFile):
+    """Отклонённый при загрузке файл: содержимого нет, есть причина."""
+    def __init__(self, name, error):
+        super().__init__(BytesIO(), name=name, size=0)
+        self.error = error
+
+
+def read_header(header):
+    """Формат и число пикселей по началу файла, None — мало данных."""
+    from PIL import Image
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', Image.DecompressionBombWarning)
+        try:
+            image = Image.open(BytesIO(header))
+        except Image.DecompressionBombError:
+            return None, math.inf
+        except Exception:
+            return None
+    width, height = image.size
+    return image.format, width * height
+
+
+class ImageUploadHandler(TemporaryFileUploadHandler):
+    """Пишет загрузку на диск, отбрасывая слишком большие картинки."""
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.header = b''
+        self.checked = False
+        self.error = None
+        self.received = 0
+        if self.content_length and \
+                self.content_length > settings.IMAGE_UPLOAD_MAX_SIZE:
+            self.reject(self.size_error())
+
+    def size_error(self):
+        return ('Файл больше '
+                f'{filesizeformat(settings.IMAGE_UPLOAD_MAX_SIZE)}.')
+
+    def reject(self, error):
+        self.error = error
+        self.header = b''
+        self.file.close()
+
+    def check_header(self, final=False):
+        """Проверяет формат и пиксели, как только хватит заголовка."""
+        found = read_header(self.header)
+        if found is None:
+            if final or len(self.header) >= HEADER_BYTES:
+                self.reject('Загрузите правильное изображение.')
+            return
+        self.checked = True
+        self.header = b''
+        image_format, pixels = found
+        if pixels > settings.IMAGE_UPLOAD_MAX_PIXELS:
+            self.reject('Слишком большое изображение.')
+        elif image_format not in settings.IMAGE_UPLOAD_FORMATS:
+            self.reject('Поддерживаются только форматы '
+                        f'{", ".join(settings.IMAGE_UPLOAD_FORMATS)}.')
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.error:
+            return None
+        self.received += len(raw_data)
+        if self.received > settings.IMAGE_UPLOAD_MAX_SIZE:
+            self.reject(self.size_error())
+            return None
+        if not self.checked:
+            self.header += raw_data
+            self.check_header()
+            if self.error:
+                return None
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        if not self.error and not self.checked:
+            self.check_header(final=True)
+        if self.error:
+            return RejectedUpload(self.file_name, self.error)
+        return super().file_complete(file_size)
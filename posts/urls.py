@@ -6,6 +6,8 @@ urlpatterns = [
     path('', views.index, name='index'),
     path('new/', views.new_post, name='new_post'),
     path("follow/", views.follow_index, name='follow_index'),
+    path('search/', views.search_posts, name='search'),
+    path('trending/', views.trending_posts, name='trending'),
     path('group/<slug:slug>/', views.group_posts, name='group'),
     path('<str:username>/', views.profile, name='profile'),
     path('<str:username>/follow/', views.profile_follow,
@@ -13,6 +15,8 @@ urlpatterns = [
     path('<str:username>/unfollow/', views.profile_unfollow,
          name='profile_unfollow'),
     path('<str:username>/<int:post_id>/', views.post_view, name='post'),
+    path('<str:username>/<int:post_id>/comments/',
+         views.post_comments, name='post_comments'),
     path('<str:username>/<int:post_id>/edit/',
          views.post_edit, name='post_edit'),
     path('<str:username>/<int:post_id>/delete/',
@@ -0,0 +1,120 @@
+"""Поиск пользователя по имени из URL без запроса к базе.
+
+Маршруты ``<username>/...`` начинаются с перевода имени в пользователя.
+Имя переводится в лёгкую запись ``UserRecord(pk, username)`` через два
+уровня: LRU в памяти процесса и общий кеш. Отсутствующие имена тоже
+запоминаются в общем кеше, поэтому поток запросов к несуществующим
+профилям не доходит до базы.
+
+Сохранение и удаление пользователя сбрасывают его имена в общем кеше
+и в памяти своего процесса; в памяти других процессов запись живёт не
+дольше USERNAME_CACHE_LOCAL_TIMEOUT секунд. Если кеш по умолчанию
+свой у каждого процесса (LocMemCache), сброс до других воркеров не
+доходит, поэтому и записи в нём, включая отсутствующие имена, живут
+не дольше USERNAME_CACHE_LOCAL_TIMEOUT.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.http import Http404
+
+from yatube.cache import is_shared
+
+User = get_user_model()
+
+UserRecord = namedtuple('UserRecord', ('pk', 'username'))
+# Отметка «такого имени нет» в общем кеше.
+MISSING = 0
+
+
+class LocalCache:
+    """LRU с временем жизни записей, общий для потоков процесса."""
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            record, expires = self.entries.get(key, (None, 0))
+            if record is None:
+                return None
+            if expires < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return record
+
+    def set(self, key, record):
+        expires = time.monotonic() + settings.USERNAME_CACHE_LOCAL_TIMEOUT
+        with self.lock:
+            self.entries[key] = (record, expires)
+            self.entries.move_to_end(key)
+            while len(self.entries) > settings.USERNAME_CACHE_SIZE:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+local = LocalCache()
+
+
+def cache_key(username):
+    name = hashlib.md5(username.encode()).hexdigest()
+    return f'username:{name}'
+
+
+def shared_timeout():
+    if is_shared(cache):
+        return settings.USERNAME_CACHE_TIMEOUT
+    return min(settings.USERNAME_CACHE_TIMEOUT,
+               settings.USERNAME_CACHE_LOCAL_TIMEOUT)
+
+
+def lookup(username):
+    """Запись пользователя с таким именем или None."""
+    key = cache_key(username)
+    record = local.get(key)
+    if record is not None:
+        return record
+    pk = cache.get(key)
+    if pk is None:
+        pk = next(iter(User.objects.filter(username=username).order_by()
+                       .values_list('pk', flat=True)[:1]), MISSING)
+        cache.set(key, pk, shared_timeout())
+    if pk == MISSING:
+        return None
+    record = UserRecord(pk, username)
+    local.set(key, record)
+    return record
+
+
+def get_or_404(username):
+    record = lookup(username)
+    if record is None:
+        raise Http404('Пользователь не найден.')
+    return record
+
+
+def forget(*usernames):
+    """Сбрасывает имена сразу и ещё раз после фиксации транзакции."""
+    keys = [cache_key(username) for username in usernames if username]
+
+    def delete():
+        cache.delete_many(keys)
+        for key in keys:
+            local.delete(key)
+
+    delete()
+    transaction.on_commit(delete)
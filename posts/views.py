@@ -1,104 +1,243 @@
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
-from django.http import HttpResponseForbidden
+from django.db import transaction
+from django.http import HttpResponseForbidden, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 
-from yatube.settings import paginator_count
+from yatube.routers import use_primary
+from yatube.settings import comments_per_page, paginator_count
+from yatube.sqlite.retry import retry_on_busy
 
+from . import images, recommendations, search, timeline, trending, usernames
+from .caching import conditional_page, tag_page
 from .forms import CommentForm, PostForm
 from .models import Follow, Group, Post
+from .paginator import CursorPaginator
 
 User = get_user_model()
 
 
+def get_page(request, posts):
+    """Страница ленты с данными для карточек постов.
+
+    По умолчанию листаем по ключу (?after=/?before=), номер страницы
+    (?page=) оставлен для старых ссылок.
+    """
+    posts = posts.for_feed()
+    if 'page' in request.GET:
+        paginator = Paginator(posts, paginator_count)
+        page = paginator.get_page(request.GET.get('page'))
+    else:
+        paginator = CursorPaginator(posts, paginator_count)
+        page = paginator.get_page(request.GET.get('after'),
+                                  request.GET.get('before'))
+    tag_page(request, *(f'post:{post.pk}' for post in page))
+    return page
+
+
+def get_comments(request, post):
+    """Порция комментариев поста после токена ?after=.
+
+    Авторы приходят одним JOIN, число комментариев не считается:
+    порция стоит одинаково для поста с пятью и с 50 тысячами
+    комментариев.
+    """
+    comments = post.comments.select_related('author')
+    paginator = CursorPaginator(comments, comments_per_page,
+                                ordering=('-created', '-id'))
+    return comments, paginator.get_page(request.GET.get('after'))
+
+
+def get_recommendations(request):
+    """Панель «кого читать» для авторизованного пользователя.
+
+    Панель меняется после его подписок и после пересчёта рекомендаций,
+    поэтому страница отмечается этими областями.
+    """
+    if not request.user.is_authenticated:
+        return []
+    tag_page(request, f'author:{request.user.pk}', 'recommendations')
+    return recommendations.for_user(request.user)
+
+
+def get_trending_groups(request):
+    """Боковая панель популярных групп, обновляется после сжатия."""
+    tag_page(request, trending.SCOPE)
+    return trending.groups()
+
+
+def first_value(queryset):
+    """Значение по уникальному ключу, без сортировки выборки."""
+    return next(iter(queryset.order_by()[:1]), None)
+
+
+def author_scopes(request, username):
+    author = usernames.lookup(username)
+    return author and [f'author:{author.pk}']
+
+
+def group_scopes(request, slug):
+    """Область группы; найденная группа остаётся в запросе для view."""
+    request.group = first_value(Group.objects.filter(slug=slug))
+    return request.group and [f'group:{request.group.pk}']
+
+
+def post_scopes(request, username, post_id):
+    """Пост и автор: карточка автора и подписка тоже на странице.
+
+    Чужой или несуществующий пост view отдаст с 404, такие ответы
+    не кешируются, поэтому сам пост здесь не проверяется.
+    """
+    author = usernames.lookup(username)
+    return author and [f'post:{post_id}', f'author:{author.pk}']
+
+
+@conditional_page(lambda request: ['feed'])
 def index(request):
-    latest = Post.objects.all()
-    paginator = Paginator(latest, paginator_count)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    return render(request, 'index.html', {'page': page})
+    page = get_page(request, Post.objects.all())
+    return render(request, 'index.html',
+                  {'page': page,
+                   'trending_groups': get_trending_groups(request)})
+
 
+@conditional_page(lambda request: [trending.SCOPE])
+def trending_posts(request):
+    """Посты с наибольшей оценкой популярности."""
+    page = get_page(request, trending.posts())
+    return render(request, 'trending.html',
+                  {'page': page,
+                   'trending_groups': get_trending_groups(request)})
 
+
+@conditional_page(group_scopes)
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    posts = Post.objects.filter(group=group)
-    paginator = Paginator(posts, paginator_count)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    group = (getattr(request, 'group', None)
+             or get_object_or_404(Group, slug=slug))
+    page = get_page(request, Post.objects.filter(group=group))
     return render(request, 'group.html', {'page': page, 'group': group})
 
 
+def search_posts(request):
+    query = request.GET.get('q', '').strip()
+    paginator = Paginator(search.SearchResults(query), paginator_count)
+    page = paginator.get_page(request.GET.get('page'))
+    return render(request, 'search.html', {'page': page, 'query': query})
+
+
 @login_required
+@use_primary
+@retry_on_busy
+@transaction.atomic
 def new_post(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
     if request.method == 'POST' and form.is_valid():
-        form = form.save(commit=False)
-        form.author = request.user
-        form.save()
+        post = form.save(commit=False)
+        post.author = request.user
+        if post.image:
+            images.discard_on_rollback(post)
+        post.save()
+        images.schedule(post)
         return redirect('index')
-    else:
-        form = PostForm()
     return render(request, 'new_post.html', {'form': form})
 
 
+@conditional_page(author_scopes)
 def profile(request, username):
     following_flag = 'NoneUser'
-    username = get_object_or_404(User, username=username)
-    posts = Post.objects.filter(author=username)
-    paginator = Paginator(posts, paginator_count)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    author = usernames.get_or_404(username)
+    username = get_object_or_404(User.objects.select_related('stats'),
+                                 pk=author.pk)
+    page = get_page(request, Post.objects.filter(author=username))
     if request.user.is_authenticated:
         following_flag = Follow.objects.filter(user=request.user,
                                                author=username).exists()
     return render(request, 'profile.html',
                   {'username': username,
                    'page': page,
-                   'following_flag': following_flag})
+                   'following_flag': following_flag,
+                   'recommendations': get_recommendations(request)})
 
 
+@conditional_page(post_scopes)
 def post_view(request, username, post_id):
     following_flag = 'NoneUser'
-    post = Post.objects.get(id=post_id)
-    comments = post.comments.all()
-    paginator = Paginator(comments, 2)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    post = get_object_or_404(
+        Post.objects.for_feed().select_related('author__stats'),
+        author__username=username, id=post_id)
+    comments, page = get_comments(request, post)
     form = CommentForm(request.POST or None)
     if request.user.is_authenticated:
         following_flag = Follow.objects.filter(user=request.user,
                                                author=post.author).exists()
     return render(request, 'post.html',
                   {'post': post,
-                   'page': page,
+                   'comments': page,
                    'form': form,
                    'comment_context': comments,
                    'following_flag': following_flag})
 
 
+@conditional_page(post_scopes)
+def post_comments(request, username, post_id):
+    """Следующая порция комментариев: HTML-фрагмент или JSON.
+
+    Формат выбирается только параметром ?format=json, а не заголовком
+    Accept: параметр входит в ключ кеша страницы и в ETag.
+    """
+    post = get_object_or_404(Post.objects.select_related('author'),
+                             author__username=username, id=post_id)
+    _, page = get_comments(request, post)
+    if request.GET.get('format') != 'json':
+        return render(request, 'include/comment_list.html',
+                      {'post': post, 'comments': page})
+    return JsonResponse({
+        'comments': [{'id': comment.id,
+                      'author': comment.author.username,
+                      'author_name': comment.author.get_full_name(),
+                      'text': comment.text,
+                      'created': comment.created.isoformat()}
+                     for comment in page],
+        'next': page.paginator.next_cursor,
+    })
+
+
 @login_required
+@use_primary
+@retry_on_busy
+@transaction.atomic
 def post_edit(request, username, post_id):
-    username = get_object_or_404(User, username=username)
-    if request.user == username:
-        post = Post.objects.get(author=username, id=post_id)
+    author = usernames.get_or_404(username)
+    if request.user.pk == author.pk:
+        post = Post.objects.get(author_id=author.pk, id=post_id)
+        previous_image = post.image.name
         form = PostForm(files=request.FILES or None, instance=post)
         if request.method == 'POST':
             form = PostForm(request.POST, files=request.FILES or None,
                             instance=post)
             if form.is_valid():
-                form = form.save(commit=False)
-                form.save()
-            return redirect('post', username, post.id)
+                post = form.save(commit=False)
+                image_changed = 'image' in form.changed_data
+                if image_changed:
+                    post.image_widths = ''
+                    images.discard_on_rollback(post)
+                post.save()
+                if image_changed:
+                    images.delete_variants(previous_image)
+                    images.schedule(post)
+                return redirect('post', username, post.id)
         return render(request, 'new_post.html', {'form': form, 'post': post})
     return HttpResponseForbidden()
 
 
 @login_required
+@use_primary
+@retry_on_busy
+@transaction.atomic
 def post_delete(request, username, post_id):
-    username = get_object_or_404(User, username=username)
-    if request.user == username:
-        post = Post.objects.get(author=username, id=post_id)
+    author = usernames.get_or_404(username)
+    if request.user.pk == author.pk:
+        post = Post.objects.get(author_id=author.pk, id=post_id)
         if request.method == 'GET':
             post.delete()
             return redirect('profile', username)
@@ -106,9 +245,12 @@ def post_delete(request, username, post_id):
 
 
 @login_required
+@use_primary
+@retry_on_busy
+@transaction.atomic
 def add_comment(request, username, post_id):
-    username = get_object_or_404(User, username=username)
-    post = Post.objects.get(author=username, id=post_id)
+    author = usernames.get_or_404(username)
+    post = Post.objects.get(author_id=author.pk, id=post_id)
     form = CommentForm(request.POST or None)
     if request.method == 'POST' and form.is_valid():
         form = form.save(commit=False)
@@ -121,28 +263,36 @@ def add_comment(request, username, post_id):
 
 @login_required
 def follow_index(request):
-    latest = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(latest, paginator_count)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    return render(request, 'follow.html', {'page': page})
+    page = get_page(request, timeline.feed(request.user))
+    return render(request, 'follow.html',
+                  {'page': page,
+                   'recommendations': get_recommendations(request)})
 
 
 @login_required
+@use_primary
+@retry_on_busy
+@transaction.atomic
 def profile_follow(request, username):
-    author = User.objects.get(username=username)
-    if not Follow.objects.filter(user=request.user, author=author).exists():
-        if request.user != author:
-            Follow.objects.get_or_create(user=request.user, author=author)
+    author = usernames.get_or_404(username)
+    if not Follow.objects.filter(user=request.user,
+                                 author_id=author.pk).exists():
+        if request.user.pk != author.pk:
+            Follow.objects.get_or_create(user=request.user,
+                                         author_id=author.pk)
         return redirect('profile', username)
     return redirect('profile', username)
 
 
 @login_required
+@use_primary
+@retry_on_busy
+@transaction.atomic
 def profile_unfollow(request, username):
-    author = User.objects.get(username=username)
-    if request.user != author:
-        Follow.objects.filter(user=request.user, author=author).delete()
+    author = usernames.get_or_404(username)
+    if request.user.pk != author.pk:
+        Follow.objects.filter(user=request.user,
+                              author_id=author.pk).delete()
     return redirect('profile', username)
 
 
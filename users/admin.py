@@ -1,3 +1,15 @@
-# from django.contrib import admin
+from django.contrib import admin
 
-# Register your models here.
+from .models import OutgoingEmail
+
+
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'recipients', 'status', 'attempts',
+                    'next_attempt', 'sent')
+    search_fields = ('recipients', 'subject')
+    list_filter = ('status',)
+    exclude = ('message',)
+    readonly_fields = ('subject', 'recipients', 'created', 'sent',
+                       'last_error')
+    empty_value_display = '-пусто-'
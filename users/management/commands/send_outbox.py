@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from users import outbox
+
+
+class Command(BaseCommand):
+    help = 'Воркер: отправляет письма из очереди пачками.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch', type=int, default=100)
+        parser.add_argument('--interval', type=float, default=5,
+                            help='Пауза в секундах, когда очередь пуста.')
+        parser.add_argument('--once', action='store_true',
+                            help='Отправить очередь один раз и выйти.')
+
+    def handle(self, *args, **options):
+        while True:
+            done, errors = outbox.deliver(options['batch'])
+            if done or errors:
+                self.stdout.write(f'отправлено {done}, ошибок {errors}')
+            if options['once'] and done + errors < options['batch']:
+                break
+            if not done + errors:
+                time.sleep(options['interval'])
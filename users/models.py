@@ -1,3 +1,56 @@
-# from django.db import models
+import pickle
 
-# Create your models here.
+from django.db import models
+from django.utils import timezone
+
+
+class OutgoingEmailQuerySet(models.QuerySet):
+    def due(self, now=None):
+        """Письма в очереди, время попытки которых пришло."""
+        return self.filter(status=OutgoingEmail.QUEUED,
+                           next_attempt__lte=now or timezone.now())
+
+
+class OutgoingEmail(models.Model):
+    """Письмо в очереди на отправку воркером send_outbox."""
+    QUEUED = 'queued'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUSES = ((QUEUED, 'В очереди'), (SENT, 'Отправлено'),
+                (FAILED, 'Не отправлено'))
+
+    # EmailMessage целиком, вместе с HTML-версией и вложениями.
+    message = models.BinaryField()
+    subject = models.CharField('subject', max_length=255)
+    recipients = models.TextField('recipients')
+    status = models.CharField('status', max_length=8, choices=STATUSES,
+                              default=QUEUED)
+    attempts = models.PositiveSmallIntegerField('attempts', default=0)
+    next_attempt = models.DateTimeField('next attempt',
+                                        default=timezone.now)
+    last_error = models.TextField('last error', blank=True)
+    created = models.DateTimeField('created', auto_now_add=True)
+    sent = models.DateTimeField('sent', null=True, blank=True)
+
+    objects = OutgoingEmailQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'OutgoingEmail'
+        ordering = ('next_attempt', 'id')
+        indexes = [
+            models.Index(fields=('status', 'next_attempt', 'id'),
+                         name='outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.subject[:30]} → {self.recipients[:30]}'
+
+    @classmethod
+    def from_message(cls, message):
+        message.connection = None
+        return cls(message=pickle.dumps(message),
+                   subject=message.subject[:255],
+                   recipients=', '.join(message.recipients()))
+
+    def to_message(self):
+        return pickle.loads(self.message)
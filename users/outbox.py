@@ -0,0 +1,94 @@
+"""Очередь писем в базе.
+
+Почтовый бэкенд ``OutboxBackend`` только сохраняет письма, запрос не ждёт
+почтовый сервер. Воркер ``manage.py send_outbox`` забирает письма пачками
+и отправляет их через ``settings.OUTBOX_BACKEND`` по одному соединению.
+Неудачная попытка повторяется с растущей паузой, после
+``OUTBOX_MAX_ATTEMPTS`` письмо помечается неотправленным.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import transaction
+from django.utils import timezone
+
+from yatube.routers import use_primary
+
+from .models import OutgoingEmail
+
+
+class OutboxBackend(BaseEmailBackend):
+    """Почтовый бэкенд, ставящий письма в очередь."""
+    def send_messages(self, email_messages):
+        emails = [OutgoingEmail.from_message(message)
+                  for message in email_messages if message.recipients()]
+        OutgoingEmail.objects.bulk_create(emails)
+        return len(emails)
+
+
+def backoff(attempts):
+    """Пауза перед следующей попыткой: удваивается с каждой неудачей."""
+    return timedelta(seconds=settings.OUTBOX_RETRY_DELAY
+                     * 2 ** (attempts - 1))
+
+
+@transaction.atomic
+def claim(batch):
+    """Забирает пачку писем, другие воркеры её не увидят до конца аренды."""
+    now = timezone.now()
+    emails = list(OutgoingEmail.objects.due(now)[:batch])
+    OutgoingEmail.objects.filter(pk__in=[email.pk for email in emails]).update(
+        next_attempt=now + timedelta(seconds=settings.OUTBOX_LEASE))
+    return emails
+
+
+def failed(email, error):
+    email.attempts += 1
+    email.last_error = f'{type(error).__name__}: {error}'
+    if email.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+        email.status = OutgoingEmail.FAILED
+    else:
+        email.next_attempt = timezone.now() + backoff(email.attempts)
+    email.save(update_fields=['attempts', 'last_error', 'status',
+                              'next_attempt'])
+
+
+def sent(email):
+    email.attempts += 1
+    email.status = OutgoingEmail.SENT
+    email.sent = timezone.now()
+    email.save(update_fields=['attempts', 'status', 'sent'])
+
+
+@use_primary
+def deliver(batch):
+    """Отправляет пачку писем по одному соединению.
+
+    Очередь читается из основной базы: реплика может не знать, что
+    письмо уже отправлено. Возвращает число отправленных и неудачных.
+    """
+    emails = claim(batch)
+    if not emails:
+        return 0, 0
+    connection = get_connection(settings.OUTBOX_BACKEND)
+    try:
+        connection.open()
+    except Exception as error:
+        for email in emails:
+            failed(email, error)
+        return 0, len(emails)
+    done = 0
+    try:
+        for email in emails:
+            try:
+                connection.send_messages([email.to_message()])
+            except Exception as error:
+                failed(email, error)
+            else:
+                sent(email)
+                done += 1
+    finally:
+        connection.close()
+    return done, len(emails) - done
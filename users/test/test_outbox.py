@@ -0,0 +1,119 @@
+import socketserver
+import threading
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from users import outbox
+from users.models import OutgoingEmail
+
+User = get_user_model()
+SMTP_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+LOCMEM_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    """Почтовый сервер для тестов: принимает письма и ничего не шлёт."""
+    def reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode())
+
+    def handle(self):
+        self.server.connections += 1
+        self.reply('220 localhost')
+        for line in self.rfile:
+            command = line.decode().strip().upper()
+            if command == 'DATA':
+                self.reply('354 end with .')
+                for data in self.rfile:
+                    if data.rstrip(b'\r\n') == b'.':
+                        break
+                self.server.messages += 1
+                self.reply('250 queued')
+            elif command == 'QUIT':
+                self.reply('221 bye')
+                return
+            else:
+                self.reply('250 ok')
+
+
+class SMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), SMTPHandler)
+        self.connections = self.messages = 0
+
+
+@override_settings(EMAIL_BACKEND='users.outbox.OutboxBackend',
+                   OUTBOX_BACKEND=LOCMEM_BACKEND)
+class OutboxTest(TestCase):
+    """Проверка очереди писем."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='mailer',
+                                            email='mailer@example.com',
+                                            password='Secret-42')
+
+    def enqueue(self, count):
+        for number in range(count):
+            mail.send_mail(f'Письмо {number}', 'Текст', 'noreply@yatube.ru',
+                           ['reader@example.com'])
+
+    def test_password_reset_only_enqueues(self):
+        """Сброс пароля ставит письмо в очередь и ничего не отправляет."""
+        response = self.client.post(reverse('password_reset'),
+                                    {'email': self.user.email})
+        self.assertEqual(response.status_code, 302)
+        email = OutgoingEmail.objects.get()
+        self.assertEqual(email.recipients, self.user.email)
+        self.assertEqual(mail.outbox, [])
+        self.assertIn('/auth/reset/', email.to_message().body)
+
+    def test_send_outbox_delivers(self):
+        """Воркер отправляет очередь и отмечает письма отправленными."""
+        self.enqueue(3)
+        call_command('send_outbox', '--once', stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertFalse(OutgoingEmail.objects.exclude(
+            status=OutgoingEmail.SENT).exists())
+
+    def test_batch_uses_one_connection(self):
+        """Пачка писем уходит на почтовый сервер по одному соединению."""
+        server = SMTPServer()
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.enqueue(5)
+        with self.settings(OUTBOX_BACKEND=SMTP_BACKEND,
+                           EMAIL_HOST='127.0.0.1',
+                           EMAIL_PORT=server.server_address[1]):
+            self.assertEqual(outbox.deliver(10), (5, 0))
+        self.assertEqual(server.messages, 5)
+        self.assertEqual(server.connections, 1)
+
+    @override_settings(OUTBOX_BACKEND=SMTP_BACKEND, EMAIL_HOST='127.0.0.1',
+                       EMAIL_PORT=9, EMAIL_TIMEOUT=1, OUTBOX_MAX_ATTEMPTS=2)
+    def test_retry_with_backoff(self):
+        """Неудачная попытка откладывает письмо, последняя — сдаётся."""
+        self.enqueue(1)
+        self.assertEqual(outbox.deliver(10), (0, 1))
+        email = OutgoingEmail.objects.get()
+        self.assertEqual(email.status, OutgoingEmail.QUEUED)
+        self.assertEqual(email.attempts, 1)
+        self.assertGreater(email.next_attempt, timezone.now())
+        self.assertEqual(outbox.deliver(10), (0, 0))
+        OutgoingEmail.objects.update(
+            next_attempt=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(outbox.deliver(10), (0, 1))
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutgoingEmail.FAILED)
+        self.assertTrue(email.last_error)
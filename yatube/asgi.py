@@ -0,0 +1,139 @@
+"""ASGI-вход для запуска под uvicorn, daphne или hypercorn.
+
+В Django 2.2 нет асинхронных view и ORM, поэтому ``WsgiToAsgi``
+принимает тело запроса и отдаёт ответ в цикле событий, а сам Django
+работает в ограниченном пуле потоков. Поток занят только пока view
+считает ответ: медленные клиенты ждут в цикле событий, а не держат
+поток, и воркер обслуживает больше запросов при том же числе потоков.
+"""
+import asyncio
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from yatube import boot
+
+boot.prepare()
+
+from django.conf import settings  # noqa: E402
+from django.core.wsgi import get_wsgi_application  # noqa: E402
+
+# Тело больше этого размера пишется во временный файл.
+BODY_IN_MEMORY = 2 ** 20
+
+
+def build_environ(scope, body):
+    """WSGI-окружение по ASGI-scope и файлу с телом запроса."""
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        # PATH_INFO в WSGI — байты UTF-8, прочитанные как latin-1.
+        'PATH_INFO': scope['path'].encode().decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+    for name, value in scope.get('headers', ()):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = f'HTTP_{name}'
+        value = value.decode('latin-1')
+        if name in environ:
+            value = f'{environ[name]},{value}'
+        environ[name] = value
+    return environ
+
+
+def call_wsgi(application, environ):
+    """Вызывает WSGI-приложение и собирает ответ целиком.
+
+    Ответ закрывается в том же потоке: Django по сигналу
+    request_finished закрывает соединения с базой этого потока.
+    """
+    started = {}
+    chunks = []
+
+    def start_response(status, headers, exc_info=None):
+        started['status'] = int(status.split(' ', 1)[0])
+        started['headers'] = [(name.lower().encode('latin-1'),
+                               value.encode('latin-1'))
+                              for name, value in headers]
+        return chunks.append
+
+    response = application(environ, start_response)
+    try:
+        chunks.extend(chunk for chunk in response if chunk)
+    finally:
+        if hasattr(response, 'close'):
+            response.close()
+    return started['status'], started['headers'], chunks
+
+
+class WsgiToAsgi:
+    """ASGI-приложение поверх WSGI-приложения и пула из ``threads``."""
+    def __init__(self, application, threads):
+        self.application = application
+        self.executor = ThreadPoolExecutor(max_workers=threads,
+                                           thread_name_prefix='asgi')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] != 'http':
+            raise ValueError(f'Тип соединения {scope["type"]} '
+                             'не поддерживается.')
+        body = await self.read_body(receive)
+        if body is None:
+            return
+        loop = asyncio.get_running_loop()
+        with body:
+            status, headers, chunks = await loop.run_in_executor(
+                self.executor, call_wsgi, self.application,
+                build_environ(scope, body))
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': headers})
+        if scope['method'] == 'HEAD':
+            chunks = []
+        for chunk in chunks:
+            await send({'type': 'http.response.body', 'body': chunk,
+                        'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+
+    async def read_body(self, receive):
+        """Тело запроса целиком или None, если клиент ушёл."""
+        body = tempfile.SpooledTemporaryFile(max_size=BODY_IN_MEMORY)
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                body.close()
+                return None
+            body.write(message.get('body', b''))
+            if not message.get('more_body'):
+                body.seek(0)
+                return body
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+django_application = get_wsgi_application()
+boot.warm_up()
+application = WsgiToAsgi(django_application, settings.ASGI_THREADS)
@@ -0,0 +1,48 @@
+"""Запуск воркера: окружение до импорта Django и прогрев после.
+
+Модуль не импортирует Django на верхнем уровне: ``prepare`` вызывается
+раньше, чем Django загружен.
+"""
+import os
+import sys
+
+ENVIRONMENT = {
+    'DJANGO_SETTINGS_MODULE': 'yatube.settings',
+}
+if sys.version_info < (3, 12):
+    # Django 2.2 импортирует distutils, а подмена из setuptools тянет
+    # за собой pkg_resources: это больше половины времени запуска.
+    ENVIRONMENT['SETUPTOOLS_USE_DISTUTILS'] = 'stdlib'
+
+
+def prepare():
+    for name, value in ENVIRONMENT.items():
+        os.environ.setdefault(name, value)
+
+
+def template_names(directory):
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if name.endswith('.html'):
+                path = os.path.join(root, name)
+                yield os.path.relpath(path, directory).replace(os.sep, '/')
+
+
+def warm_up():
+    """Импортирует маршруты с view и компилирует шаблоны проекта.
+
+    Без DEBUG шаблоны хранит кеширующий загрузчик, так что первый запрос
+    воркера не разбирает base.html и карточки постов.
+    """
+    from django.conf import settings
+    from django.template import engines
+    from django.urls import get_resolver
+
+    # Обращение к таблице reverse импортирует urlconf со всеми view.
+    get_resolver().reverse_dict
+    if settings.DEBUG:
+        return
+    for engine in engines.all():
+        for directory in engine.dirs:
+            for name in template_names(directory):
+                engine.get_template(name)
@@ -0,0 +1,187 @@
+"""Кеш в файле SQLite, общий для всех процессов одной машины.
+
+LocMemCache живёт внутри процесса: каждый воркер gunicorn прогревает
+свой кеш, а сброс ключа в одном воркере не виден остальным. Этот бэкенд
+хранит записи в одном файле SQLite в режиме WAL, читатели не блокируют
+друг друга, а сброс сразу виден всем процессам.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.locmem import LocMemCache
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache ('
+    'key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL'
+    ') WITHOUT ROWID',
+    'CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)',
+)
+# Старые записи вычищаются не на каждой записи, а раз в CULL_EVERY записей.
+CULL_EVERY = 100
+# Ограничение SQLite на число параметров в одном запросе.
+CHUNK_SIZE = 500
+
+
+class SQLiteCache(BaseCache):
+    """Кеш Django поверх файла SQLite (LOCATION — путь к файлу)."""
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        self._local = threading.local()
+        self._writes = 0
+
+    def _connection(self):
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            # После fork соединение родителя использовать нельзя.
+            local.connection = self._connect()
+            local.pid = os.getpid()
+        return local.connection
+
+    def _connect(self):
+        directory = os.path.dirname(self._path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(self._path, timeout=5,
+                                     isolation_level=None)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        for statement in SCHEMA:
+            connection.execute(statement)
+        return connection
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _expires(self, timeout):
+        return self.get_backend_timeout(timeout)
+
+    def _write(self, sql, params):
+        cursor = self._connection().execute(sql, params)
+        self._writes += 1
+        if self._writes % CULL_EVERY == 0:
+            self._cull()
+        return cursor.rowcount
+
+    def _cull(self):
+        connection = self._connection()
+        connection.execute('DELETE FROM cache WHERE expires <= ?',
+                           (time.time(),))
+        count = connection.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        if count > self._max_entries:
+            connection.execute(
+                'DELETE FROM cache WHERE key IN (SELECT key FROM cache '
+                'ORDER BY expires IS NULL, expires LIMIT ?)',
+                (count // self._cull_frequency or 1,))
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        return bool(self._write(
+            'INSERT INTO cache (key, value, expires) VALUES (?, ?, ?) '
+            'ON CONFLICT (key) DO UPDATE SET '
+            'value = excluded.value, expires = excluded.expires '
+            'WHERE cache.expires <= ?',
+            (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+             self._expires(timeout), time.time())))
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        row = self._connection().execute(
+            'SELECT value FROM cache WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (key, time.time())).fetchone()
+        return default if row is None else pickle.loads(row[0])
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        self._write(
+            'INSERT OR REPLACE INTO cache (key, value, expires) '
+            'VALUES (?, ?, ?)',
+            (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+             self._expires(timeout)))
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        return bool(self._write(
+            'UPDATE cache SET expires = ? WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (self._expires(timeout), key, time.time())))
+
+    def delete(self, key, version=None):
+        key = self._key(key, version)
+        return bool(self._write('DELETE FROM cache WHERE key = ?', (key,)))
+
+    def has_key(self, key, version=None):
+        return self.get(key, self, version=version) is not self
+
+    def get_many(self, keys, version=None):
+        names = {self._key(key, version): key for key in keys}
+        found = {}
+        keys = list(names)
+        for start in range(0, len(keys), CHUNK_SIZE):
+            chunk = keys[start:start + CHUNK_SIZE]
+            rows = self._connection().execute(
+                'SELECT key, value FROM cache WHERE key IN (%s) '
+                'AND (expires IS NULL OR expires > ?)'
+                % ', '.join('?' * len(chunk)),
+                (*chunk, time.time()))
+            for key, value in rows:
+                found[names[key]] = pickle.loads(value)
+        return found
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self._expires(timeout)
+        rows = [(self._key(key, version),
+                 pickle.dumps(value, pickle.HIGHEST_PROTOCOL), expires)
+                for key, value in data.items()]
+        connection = self._connection()
+        with connection:
+            connection.execute('BEGIN')
+            connection.executemany(
+                'INSERT OR REPLACE INTO cache (key, value, expires) '
+                'VALUES (?, ?, ?)', rows)
+        return []
+
+    def delete_many(self, keys, version=None):
+        rows = [(self._key(key, version),) for key in keys]
+        connection = self._connection()
+        with connection:
+            connection.execute('BEGIN')
+            connection.executemany('DELETE FROM cache WHERE key = ?', rows)
+
+    def incr(self, key, delta=1, version=None):
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            value = self.get(key, self, version=version)
+            if value is self:
+                raise ValueError("Key '%s' not found" % key)
+            value += delta
+            connection.execute(
+                'UPDATE cache SET value = ? WHERE key = ?',
+                (pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+                 self._key(key, version)))
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+        return value
+
+    def clear(self):
+        self._connection().execute('DELETE FROM cache')
+
+    def close(self, **kwargs):
+        # Соединение держим открытым между запросами, как и LocMemCache.
+        pass
+
+
+def is_shared(cache):
+    """Видят ли записи кеша другие процессы: LocMemCache — нет."""
+    # InstrumentedCache хранит настоящий бэкенд в _cache.
+    return not isinstance(getattr(cache, '_cache', cache), LocMemCache)
@@ -0,0 +1,243 @@
+"""Метрики запросов в формате Prometheus.
+
+``MetricsMiddleware`` замеряет для каждого запроса с известным именем
+маршрута общее время, число и время SQL-запросов, время отрисовки
+шаблонов и попадания в кеш. Замеры складываются в гистограммы внутри
+процесса, ``/metrics`` отдаёт их в текстовом формате Prometheus.
+Каждый воркер считает свои метрики, Prometheus собирает их по процессам.
+"""
+import bisect
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import InvalidCacheBackendError
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from django.template.backends.django import DjangoTemplates
+from django.template.backends.django import Template as DjangoTemplate
+from django.utils.crypto import constant_time_compare
+from django.utils.module_loading import import_string
+
+SECONDS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1,
+           2.5, 5, 10)
+QUERIES = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+HISTOGRAMS = {
+    'yatube_request_duration_seconds': ('Время ответа.', SECONDS),
+    'yatube_request_queries': ('SQL-запросов за запрос.', QUERIES),
+    'yatube_request_query_seconds': ('Время SQL за запрос.', SECONDS),
+    'yatube_request_template_seconds': ('Время отрисовки шаблонов.',
+                                        SECONDS),
+}
+CACHE_COUNTER = 'yatube_cache_requests_total'
+
+_local = threading.local()
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def samples(self):
+        """Накопительные счётчики по границам и последняя +Inf."""
+        total = 0
+        for bound, count in zip((*self.buckets, '+Inf'), self.counts):
+            total += count
+            yield bound, total
+
+
+class Registry:
+    """Гистограммы и счётчики кеша по именам маршрутов."""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.cache = {}
+
+    def record(self, view, sample):
+        values = {
+            'yatube_request_duration_seconds': sample.duration,
+            'yatube_request_queries': sample.queries,
+            'yatube_request_query_seconds': sample.query_time,
+            'yatube_request_template_seconds': sample.template_time,
+        }
+        with self.lock:
+            for name, value in values.items():
+                histogram = self.histograms.get((name, view))
+                if histogram is None:
+                    histogram = self.histograms[name, view] = Histogram(
+                        HISTOGRAMS[name][1])
+                histogram.observe(value)
+            for result, count in (('hit', sample.cache_hits),
+                                  ('miss', sample.cache_misses)):
+                self.cache[view, result] = (self.cache.get((view, result), 0)
+                                            + count)
+
+    def clear(self):
+        with self.lock:
+            self.histograms.clear()
+            self.cache.clear()
+
+    def render(self):
+        lines = []
+        with self.lock:
+            for name, (help_text, _) in HISTOGRAMS.items():
+                lines += [f'# HELP {name} {help_text}',
+                          f'# TYPE {name} histogram']
+                for (metric, view), histogram in sorted(
+                        self.histograms.items()):
+                    if metric != name:
+                        continue
+                    for bound, total in histogram.samples():
+                        lines.append(f'{name}_bucket{{view="{view}",'
+                                     f'le="{bound}"}} {total}')
+                    lines.append(f'{name}_sum{{view="{view}"}} '
+                                 f'{histogram.sum}')
+                    lines.append(f'{name}_count{{view="{view}"}} '
+                                 f'{sum(histogram.counts)}')
+            lines += [f'# HELP {CACHE_COUNTER} Обращения к кешу.',
+                      f'# TYPE {CACHE_COUNTER} counter']
+            for (view, result), count in sorted(self.cache.items()):
+                lines.append(f'{CACHE_COUNTER}{{view="{view}",'
+                             f'result="{result}"}} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+class Sample:
+    """Замеры одного запроса, пишутся из обёрток SQL, шаблонов и кеша."""
+    __slots__ = ('duration', 'queries', 'query_time', 'template_time',
+                 'cache_hits', 'cache_misses', 'depth')
+
+    def __init__(self):
+        self.duration = self.query_time = self.template_time = 0
+        self.queries = self.cache_hits = self.cache_misses = 0
+        # Шаблон, отрисованный внутри другого, не считается дважды.
+        self.depth = 0
+
+
+def current():
+    return getattr(_local, 'sample', None)
+
+
+def time_query(execute, sql, params, many, context):
+    sample = current()
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        if sample is not None:
+            sample.queries += 1
+            sample.query_time += time.perf_counter() - started
+
+
+class MetricsMiddleware:
+    """Собирает замеры запроса; должен стоять первым в MIDDLEWARE."""
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        sample = _local.sample = Sample()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(time_query))
+                response = self.get_response(request)
+        finally:
+            _local.sample = None
+        sample.duration = time.perf_counter() - started
+        match = request.resolver_match
+        if match is not None and match.url_name:
+            registry.record(match.view_name, sample)
+        return response
+
+
+class Template(DjangoTemplate):
+    def render(self, context=None, request=None):
+        sample = current()
+        if sample is None:
+            return super().render(context, request)
+        sample.depth += 1
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            sample.depth -= 1
+            if not sample.depth:
+                sample.template_time += time.perf_counter() - started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Шаблонизатор Django, засекающий время отрисовки."""
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return Template(template.template, self)
+
+
+class InstrumentedCache:
+    """Обёртка над бэкендом кеша из OPTIONS['BACKEND'], считает попадания."""
+    def __init__(self, location, params):
+        params = dict(params)
+        options = dict(params.get('OPTIONS', {}))
+        try:
+            backend = import_string(options.pop('BACKEND'))
+        except (KeyError, ImportError) as error:
+            raise InvalidCacheBackendError(error)
+        params['OPTIONS'] = options
+        self._cache = backend(location, params)
+
+    def __getattr__(self, name):
+        return getattr(self._cache, name)
+
+    def __contains__(self, key):
+        return key in self._cache
+
+    def get(self, key, default=None, version=None):
+        value = self._cache.get(key, _missing, version=version)
+        self._count(value is not _missing, 1)
+        return default if value is _missing else value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        found = self._cache.get_many(keys, version=version)
+        self._count(len(found), len(keys))
+        return found
+
+    @staticmethod
+    def _count(hits, total):
+        sample = current()
+        if sample is not None:
+            sample.cache_hits += hits
+            sample.cache_misses += total - hits
+
+
+_missing = object()
+
+
+def is_allowed(request):
+    token = settings.METRICS_TOKEN
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    if token and constant_time_compare(header, f'Bearer {token}'):
+        return True
+    return request.user.is_staff
+
+
+def metrics_view(request):
+    if not is_allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(),
+                        content_type='text/plain; version=0.0.4')
@@ -0,0 +1,148 @@
+"""Чтение с реплик, запись в основную базу.
+
+Реплики перечислены в ``settings.DATABASE_REPLICAS``. Запросы на
+чтение уходят на случайную реплику, кроме случаев, когда данные нужны
+свежими:
+
+* view помечен ``use_primary`` (все пишущие view);
+* в этом запросе уже была запись;
+* пользователь недавно писал: ``ReplicaMiddleware`` ставит cookie на
+  ``REPLICA_STICKY_SECONDS``, пока реплика может отставать;
+* сессии и пользователи всегда читаются из основной базы;
+* файла реплики ещё нет: ``sync_replicas`` её не скопировал.
+
+Реплика — снимок, который ``sync_replicas`` подменяет раз в
+``REPLICA_SYNC_INTERVAL`` секунд; время изменения файла — момент
+снимка. Соединения с репликами не переиспользуются, поэтому запрос
+видит последний снимок, а ``replica_snapshot`` сообщает, насколько
+старые данные он прочитал: кеш не должен хранить ответы, собранные
+до последних изменений.
+"""
+import os
+import random
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+
+STICKY_COOKIE = 'primary_until'
+PRIMARY_APPS = {'auth', 'sessions', 'contenttypes', 'admin'}
+
+_state = threading.local()
+
+
+def pinned():
+    return getattr(_state, 'primary', False)
+
+
+def replica_snapshot():
+    """Время самого старого снимка реплики, прочитанного запросом, или None."""
+    return getattr(_state, 'snapshot', None)
+
+
+def snapshot_time(alias):
+    """Время снимка реплики или None, если его ещё нет."""
+    try:
+        return os.stat(settings.DATABASE_REPLICAS[alias]).st_mtime
+    except OSError:
+        return None
+
+
+def use_primary(view):
+    """Все запросы view идут в основную базу."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        previous, _state.primary = pinned(), True
+        try:
+            return view(*args, **kwargs)
+        finally:
+            _state.primary = previous
+    return wrapper
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = list(settings.DATABASE_REPLICAS)
+        if (not replicas or pinned()
+                or model._meta.app_label in PRIMARY_APPS):
+            return DEFAULT_DB_ALIAS
+        alias = random.choice(replicas)
+        # Файл проверяется до открытия соединения: снимок не старше этого.
+        taken = snapshot_time(alias)
+        if taken is None:
+            # sync_replicas ещё не скопировал базу.
+            return DEFAULT_DB_ALIAS
+        previous = replica_snapshot()
+        _state.snapshot = taken if previous is None else min(previous, taken)
+        return alias
+
+    def db_for_write(self, model, **hints):
+        # После записи запрос читает только свои данные.
+        _state.primary = True
+        _state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики — копии основной базы, объекты из них совместимы.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaMiddleware:
+    """Закрепляет за основной базой пользователей, которые недавно писали."""
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            sticky = float(request.COOKIES.get(STICKY_COOKIE, 0))
+        except ValueError:
+            sticky = 0
+        _state.primary = sticky > time.time()
+        _state.wrote = False
+        _state.snapshot = None
+        try:
+            response = self.get_response(request)
+            wrote = _state.wrote
+        finally:
+            _state.primary = _state.wrote = False
+            _state.snapshot = None
+        if wrote and settings.DATABASE_REPLICAS:
+            seconds = settings.REPLICA_STICKY_SECONDS
+            response.set_cookie(STICKY_COOKIE, str(time.time() + seconds),
+                                max_age=seconds, httponly=True,
+                                samesite='Lax')
+        return response
+
+
+class PrimaryReadCache:
+    """Кеш фрагментов, который не пишет данные, прочитанные с реплики.
+
+    Чтения и сброс идут в кеш ``OPTIONS['CACHE']`` как есть, а запись
+    пропускается, если запрос читал реплику: фрагмент, собранный из
+    старого снимка, пережил бы и снимок, и сброс ключа.
+    """
+    def __init__(self, location, params):
+        self.alias = params.get('OPTIONS', {}).get('CACHE', 'default')
+
+    def __getattr__(self, name):
+        return getattr(caches[self.alias], name)
+
+    def add(self, *args, **kwargs):
+        if replica_snapshot() is None:
+            return caches[self.alias].add(*args, **kwargs)
+        return False
+
+    def set(self, *args, **kwargs):
+        if replica_snapshot() is None:
+            caches[self.alias].set(*args, **kwargs)
+
+    def set_many(self, data, *args, **kwargs):
+        if replica_snapshot() is None:
+            return caches[self.alias].set_many(data, *args, **kwargs)
+        return list(data)
@@ -11,7 +11,8 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 SECRET_KEY = '9)(5=x-3$!qpbxgxfyx10m%wl@xfez2+4hhh++t@o!#f)f0825'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = False
+# YATUBE_DEBUG=1 включает режим разработки и debug_toolbar.
+DEBUG = os.environ.get('YATUBE_DEBUG') == '1'
 
 ALLOWED_HOSTS = ['84.201.165.17',
 		 'localhost',
@@ -24,7 +25,6 @@ ALLOWED_HOSTS = ['84.201.165.17',
 # Application definition
 
 INSTALLED_APPS = [
-    'sorl.thumbnail',
     'about',
     'users',
     'posts',
@@ -34,26 +34,34 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
-    'debug_toolbar',
 ]
 
 MIDDLEWARE = [
+    'yatube.metrics.MetricsMiddleware',
+    'yatube.routers.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'yatube.staticfiles.PrecompressedStaticMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
 ]
 
+# Инструменты разработки не загружаются в рабочем режиме.
+if DEBUG:
+    INSTALLED_APPS += ['debug_toolbar']
+    MIDDLEWARE += ['debug_toolbar.middleware.DebugToolbarMiddleware']
+
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
-        'DIRS': ['templates'],
+        'BACKEND': 'yatube.metrics.TimedDjangoTemplates',
+        'DIRS': [os.path.join(BASE_DIR, 'templates')],
+        # Без DEBUG Django оборачивает загрузчики в кеширующий,
+        # yatube.boot.warm_up заполняет его при запуске воркера.
         'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
@@ -69,17 +77,51 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
+# Потоков Django на воркер при запуске через yatube.asgi:application.
+ASGI_THREADS = int(os.environ.get('YATUBE_ASGI_THREADS', 8))
+
 
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# SQLite в режиме WAL с очередью писателей, см. yatube/sqlite/base.py.
+# Соединение живёт CONN_MAX_AGE секунд и переиспользуется запросами.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'yatube.sqlite',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': 600,
+        'OPTIONS': {
+            # Сколько секунд ждать блокировку записи.
+            'timeout': 5,
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
+# Реплики только для чтения: копии базы, которые обновляет
+# `manage.py sync_replicas`. Пути через запятую в YATUBE_DB_REPLICAS.
+DATABASE_REPLICAS = {}
+for number, path in enumerate(
+        filter(None, os.environ.get('YATUBE_DB_REPLICAS', '').split(',')),
+        start=1):
+    DATABASE_REPLICAS[f'replica{number}'] = path
+    DATABASES[f'replica{number}'] = {
+        'ENGINE': 'yatube.sqlite',
+        'NAME': f'file:{path}?mode=ro',
+        # Открытое соединение читало бы старый файл и после подмены.
+        'CONN_MAX_AGE': 0,
+        'OPTIONS': {'pragmas': {'journal_mode': 'DELETE'}, 'timeout': 5},
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['yatube.routers.PrimaryReplicaRouter']
+# Раз в сколько секунд `manage.py sync_replicas` обновляет реплики.
+REPLICA_SYNC_INTERVAL = int(os.environ.get('YATUBE_REPLICA_SYNC_INTERVAL',
+                                           30))
+# Сколько секунд после записи пользователь читает из основной базы:
+# запись попадает в реплику не позже чем через интервал и копирование.
+REPLICA_STICKY_SECONDS = 2 * REPLICA_SYNC_INTERVAL
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -119,31 +161,123 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'static')
+# collectstatic добавляет хеш к именам и сжимает файлы в .gz и .br
+# (.br — если установлен brotli из requirements.txt).
+STATICFILES_STORAGE = 'yatube.staticfiles.CompressedManifestStaticFilesStorage'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Картинки постов готовит пул из IMAGE_WORKERS потоков самого
+# приложения. С YATUBE_IMAGE_WORKERS=0 пул выключен, и картинки готовит
+# отдельный воркер `manage.py process_images`.
+IMAGE_WORKERS = int(os.environ.get('YATUBE_IMAGE_WORKERS', 2))
+
+# Загрузки сразу пишутся на диск, картинки проверяются по мере получения.
+FILE_UPLOAD_HANDLERS = ['posts.uploadhandlers.ImageUploadHandler']
+IMAGE_UPLOAD_MAX_SIZE = 10 * 2 ** 20
+IMAGE_UPLOAD_MAX_PIXELS = 40_000_000
+IMAGE_UPLOAD_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+
 # Login
 
 LOGIN_URL = '/auth/login/'
 LOGIN_REDIRECT_URL = 'index'
 # LOGOUT_REDIRECT_URL = "index"
 
-#  подключаем движок filebased.EmailBackend
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# Письма ставятся в очередь в базе, запрос не ждёт почтовый сервер.
+# Отправляет их `manage.py send_outbox` через OUTBOX_BACKEND.
+EMAIL_BACKEND = 'users.outbox.OutboxBackend'
+OUTBOX_BACKEND = os.environ.get(
+    'YATUBE_OUTBOX_BACKEND',
+    'django.core.mail.backends.filebased.EmailBackend')
 # указываем директорию, в которую будут складываться файлы писем
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+EMAIL_HOST = os.environ.get('YATUBE_EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.environ.get('YATUBE_EMAIL_PORT', 25))
+# Попыток отправить письмо, пауза перед второй попыткой в секундах
+# (дальше удваивается) и сколько секунд пачка закреплена за воркером.
+OUTBOX_MAX_ATTEMPTS = 6
+OUTBOX_RETRY_DELAY = 60
+OUTBOX_LEASE = 300
 
 # Paginator
 paginator_count = 10
+# Комментарии под постом подгружаются порциями такого размера.
+comments_per_page = 20
+
+# Лента подписок: раскладывать посты по лентам подписчиков при записи.
+# Авторы с числом подписчиков больше TIMELINE_FANOUT_LIMIT читаются
+# при запросе, после подписки в ленту попадают TIMELINE_BACKFILL постов.
+TIMELINE_FANOUT = True
+TIMELINE_FANOUT_LIMIT = 1000
+TIMELINE_BACKFILL = 200
+
+# Панель «кого читать»: авторов в панели и сколько последних подписок
+# автора или читателя учитывает `manage.py rebuild_recommendations`.
+RECOMMENDATIONS_COUNT = 5
+RECOMMENDATIONS_SAMPLE = 200
+
+# Популярное: вклад комментария и подписки убывает вдвое за
+# TRENDING_HALF_LIFE секунд. `manage.py compact_trending` удаляет строки
+# с оценкой меньше TRENDING_MIN_SCORE и оставляет TRENDING_SIZE лучших.
+# Страницы популярного обновляются после событий не чаще раза в
+# TRENDING_REFRESH секунд.
+TRENDING_HALF_LIFE = 6 * 60 * 60
+TRENDING_COMMENT_WEIGHT = 1
+TRENDING_FOLLOW_WEIGHT = 3
+TRENDING_MIN_SCORE = 0.01
+TRENDING_SIZE = 1000
+TRENDING_GROUPS = 5
+TRENDING_REFRESH = 60
+
+# Имена пользователей из URL: записей в памяти процесса и сколько секунд
+# они там живут, сколько секунд имя (и его отсутствие) хранит общий кеш.
+USERNAME_CACHE_SIZE = 10000
+USERNAME_CACHE_LOCAL_TIMEOUT = 30
+USERNAME_CACHE_TIMEOUT = 600
 
 # cashe
+# YATUBE_CACHE выбирает бэкенд: locmem — свой кеш у каждого процесса,
+# sqlite или file — общий кеш для всех воркеров на машине.
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'sqlite': 'yatube.cache.SQLiteCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+}
+CACHE_LOCATIONS = {
+    'locmem': '',
+    'sqlite': os.path.join(BASE_DIR, 'cache', 'cache.sqlite3'),
+    'file': os.path.join(BASE_DIR, 'cache', 'files'),
+}
+CACHE_NAME = os.environ.get('YATUBE_CACHE', 'locmem')
+# Кеш своего процесса не видит сбросов из других воркеров, поэтому
+# страницы и версии областей живут в нём не дольше CACHE_LOCAL_TIMEOUT
+# секунд.
+CACHE_LOCAL_TIMEOUT = 30
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+        # Обёртка считает попадания в кеш для метрик запросов.
+        'BACKEND': 'yatube.metrics.InstrumentedCache',
+        'LOCATION': os.environ.get('YATUBE_CACHE_LOCATION',
+                                   CACHE_LOCATIONS[CACHE_NAME]),
+        'KEY_PREFIX': 'yatube',
+        # Смена версии после выкладки отбрасывает ключи прошлого релиза.
+        'VERSION': int(os.environ.get('YATUBE_CACHE_VERSION', 1)),
+        'OPTIONS': {'BACKEND': CACHE_BACKENDS[CACHE_NAME],
+                    'MAX_ENTRIES': 10000},
+    },
+    # Фрагменты шаблонов: тот же кеш, но без записи данных с реплик.
+    'fragments': {
+        'BACKEND': 'yatube.routers.PrimaryReadCache',
+        'OPTIONS': {'CACHE': 'default'},
+    },
 }
 
+# Метрики на /metrics видны персоналу и по заголовку
+# `Authorization: Bearer <YATUBE_METRICS_TOKEN>`.
+METRICS_TOKEN = os.environ.get('YATUBE_METRICS_TOKEN', '')
+
 INTERNAL_IPS = [
     "127.0.0.1",
 ]
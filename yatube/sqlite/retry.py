@@ -0,0 +1,61 @@
+import random
+import threading
+import time
+from functools import wraps
+
+from django.db import OperationalError, connection
+
+
+def is_busy(error):
+    return 'locked' in str(error) or 'busy' in str(error)
+
+
+# Действия, которые отменяют побочные эффекты текущей попытки view.
+_attempt = threading.local()
+
+
+def on_rollback(callback):
+    """Вызовет callback, если текущая попытка view закончится ошибкой.
+
+    Транзакция откатывает только базу: так убирают, например, файлы,
+    которые попытка уже записала в хранилище.
+    """
+    callbacks = getattr(_attempt, 'callbacks', None)
+    if callbacks is not None:
+        callbacks.append(callback)
+
+
+def attempt(view, *args, **kwargs):
+    previous, _attempt.callbacks = getattr(_attempt, 'callbacks', None), []
+    try:
+        return view(*args, **kwargs)
+    except BaseException:
+        for callback in _attempt.callbacks:
+            callback()
+        raise
+    finally:
+        _attempt.callbacks = previous
+
+
+def retry_on_busy(view=None, *, attempts=3, delay=0.05):
+    """Повторяет view, если SQLite не дождался блокировки записи.
+
+    Ставится снаружи transaction.atomic: откатившаяся транзакция
+    выполняется заново целиком, а перед этим вызываются действия
+    ``on_rollback`` неудачной попытки. Внутри чужой транзакции не
+    повторяет.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            for number in range(attempts):
+                try:
+                    return attempt(view, *args, **kwargs)
+                except OperationalError as error:
+                    if (not is_busy(error) or number == attempts - 1
+                            or connection.in_atomic_block):
+                        raise
+                time.sleep(delay * 2 ** number * random.uniform(1, 2))
+        return wrapper
+
+    return decorator(view) if view is not None else decorator
@@ -0,0 +1,159 @@
+"""Статика с хешами в именах и заранее сжатыми копиями.
+
+``collectstatic`` через ``CompressedManifestStaticFilesStorage`` пишет
+рядом с исходными файлами копии с хешем содержимого в имени, манифест
+``staticfiles.json`` и сжатые ``.gz`` и ``.br`` для текстовых форматов
+(brotli есть в requirements.txt; без него пишутся только ``.gz``).
+Тег ``{% static %}`` выдаёт имена с хешем.
+``PrecompressedStaticMiddleware`` отдаёт такие файлы в лучшем сжатии,
+которое принимает браузер, и разрешает хранить их год: при изменении
+файла меняется имя.
+"""
+import gzip
+import mimetypes
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import (ManifestStaticFilesStorage,
+                                                staticfiles_storage)
+from django.core.files.base import ContentFile
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE = ('.css', '.js', '.svg', '.txt', '.html', '.map', '.json',
+                '.xml', '.ico', '.eot', '.ttf', '.otf')
+# Меньшие файлы сжатие почти не уменьшает.
+MIN_SIZE = 256
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+def accepted_encodings(header):
+    """Качество каждой кодировки из Accept-Encoding, q=0 — запрет."""
+    accepted = {}
+    for item in header.split(','):
+        encoding, *params = (part.strip() for part in item.split(';'))
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if encoding:
+            accepted[encoding.lower()] = quality
+    return accepted
+
+
+def compressors():
+    """Расширение, кодировка и функция сжатия, лучшие первыми."""
+    if brotli is not None:
+        yield '.br', 'br', lambda data: brotli.compress(data, quality=11)
+    yield '.gz', 'gzip', lambda data: gzip.compress(data, 9, mtime=0)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Манифест хешей и сжатые копии файлов с хешем в имени.
+
+    Файлы, которых нет в манифесте (не собраны ``collectstatic``),
+    отдаются по исходному имени, а не роняют страницу.
+    """
+    manifest_strict = False
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        hashed = set()
+        for name, hashed_name, processed in super().post_process(
+                paths, dry_run, **options):
+            if hashed_name and not isinstance(processed, Exception):
+                hashed.add(hashed_name)
+            yield name, hashed_name, processed
+        if not dry_run:
+            for name in sorted(hashed):
+                self.compress(name)
+
+    def compress(self, name):
+        if not name.endswith(COMPRESSIBLE):
+            return
+        with self.open(name) as original:
+            content = original.read()
+        if len(content) < MIN_SIZE:
+            return
+        for extension, _, function in compressors():
+            data = function(content)
+            if len(data) < len(content):
+                if self.exists(name + extension):
+                    self.delete(name + extension)
+                self._save(name + extension, ContentFile(data))
+
+
+class PrecompressedStaticMiddleware:
+    """Отдаёт статику с хешем в имени: сжатую копию и заголовок immutable.
+
+    Файлы без хеша пропускаются дальше, их отдаёт веб-сервер или
+    ``runserver``.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.encodings = None
+
+    def __call__(self, request):
+        name = self.static_name(request)
+        if name is None or request.method not in ('GET', 'HEAD'):
+            return self.get_response(request)
+        # Имя меняется вместе с содержимым: любая копия у браузера свежая.
+        if 'HTTP_IF_MODIFIED_SINCE' in request.META:
+            response = HttpResponseNotModified()
+        else:
+            response = self.serve(request, name)
+        response['Cache-Control'] = IMMUTABLE
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+    def static_name(self, request):
+        """Имя файла с хешем из пути запроса или None."""
+        if not request.path.startswith(settings.STATIC_URL):
+            return None
+        if self.encodings is None:
+            self.encodings = self.load()
+        name = request.path[len(settings.STATIC_URL):]
+        return name if name in self.encodings else None
+
+    def load(self):
+        """Сжатые копии, найденные на диске, для каждого файла с хешем."""
+        encodings = {}
+        for name in set(staticfiles_storage.hashed_files.values()):
+            path = staticfiles_storage.path(name)
+            if os.path.exists(path):
+                encodings[name] = [
+                    (extension, encoding)
+                    for extension, encoding, _ in compressors()
+                    if os.path.exists(path + extension)]
+        return encodings
+
+    def serve(self, request, name):
+        accepted = accepted_encodings(
+            request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        for extension, encoding in self.encodings[name]:
+            if accepted.get(encoding, accepted.get('*', 0)) > 0:
+                break
+        else:
+            extension = encoding = ''
+        path = staticfiles_storage.path(name)
+        response = FileResponse(open(path + extension, 'rb'))
+        # Тип по исходному имени, иначе .gz отдался бы как архив.
+        content_type, _ = mimetypes.guess_type(name)
+        response['Content-Type'] = content_type or 'application/octet-stream'
+        if encoding:
+            response['Content-Encoding'] = encoding
+        return response
@@ -1,7 +1,8 @@
-import os
+from yatube import boot
 
-from django.core.wsgi import get_wsgi_application
+boot.prepare()
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+from django.core.wsgi import get_wsgi_application  # noqa: E402
 
 application = get_wsgi_application()
+boot.warm_up()